@@ -0,0 +1,281 @@
+import bisect
+import json
+import threading
+from datetime import datetime
+from database import get_db_connection, parse_prix
+
+# Bornes (FCFA) des tranches de budget maximum, en progression géométrique
+BORNES_PRIX = [50000 * 2 ** i for i in range(16)]
+
+
+class RechercheSauvegardee:
+    """Critères d'une recherche sauvegardée"""
+
+    __slots__ = ('id', 'email', 'quartier', 'type', 'prix_min', 'prix_max', 'chambres_min')
+
+    def __init__(self, id, email, quartier=None, type=None, prix_min=None, prix_max=None, chambres_min=None):
+        self.id = id
+        self.email = email
+        self.quartier = quartier.lower() if quartier else None
+        self.type = type.lower() if type else None
+        self.prix_min = prix_min
+        self.prix_max = prix_max
+        self.chambres_min = chambres_min
+
+    def correspond(self, quartier, type_annonce, prix, chambres):
+        """Vérification exacte des critères (appelée sur les seuls candidats)"""
+        if self.quartier and self.quartier != quartier:
+            return False
+        if self.type and self.type != type_annonce:
+            return False
+        if self.prix_min is not None or self.prix_max is not None:
+            if prix is None:
+                return False
+            if self.prix_min is not None and prix < self.prix_min:
+                return False
+            if self.prix_max is not None and prix > self.prix_max:
+                return False
+        if self.chambres_min and (chambres or 0) < self.chambres_min:
+            return False
+        return True
+
+
+def tranche_prix(prix):
+    """Indice de la tranche de budget contenant ``prix`` (dernière = sans plafond)"""
+    if prix is None:
+        return len(BORNES_PRIX)
+    return bisect.bisect_left(BORNES_PRIX, prix)
+
+
+class AlertMatcher:
+    """Index inversé des recherches sauvegardées
+
+    Les recherches sont rangées par (quartier, type) puis par tranche de budget
+    maximum : une annonce n'est comparée qu'aux recherches dont le quartier et
+    le type sont compatibles et dont le budget peut couvrir son prix.
+    """
+
+    def __init__(self):
+        # (quartier | None, type | None) -> [liste de recherches par tranche]
+        self._index = {}
+        self.dernier_id = 0
+        self.total = 0
+
+    def ajouter(self, recherche):
+        cle = (recherche.quartier, recherche.type)
+        tranches = self._index.get(cle)
+        if tranches is None:
+            tranches = self._index[cle] = [[] for _ in range(len(BORNES_PRIX) + 1)]
+        tranches[tranche_prix(recherche.prix_max)].append(recherche)
+        self.dernier_id = max(self.dernier_id, recherche.id)
+        self.total += 1
+
+    def candidats(self, quartier, type_annonce, prix):
+        """Recherches pouvant correspondre à l'annonce, sans vérification fine"""
+        if prix is None:
+            # Prix inconnu : seules les recherches sans plafond sont possibles
+            debut = len(BORNES_PRIX)
+        else:
+            debut = tranche_prix(prix)
+        for cle in ((quartier, type_annonce), (quartier, None), (None, type_annonce), (None, None)):
+            tranches = self._index.get(cle)
+            if tranches is None:
+                continue
+            for tranche in tranches[debut:]:
+                yield from tranche
+
+    def correspondances(self, annonce):
+        """Recherches sauvegardées correspondant à une annonce"""
+        quartier = (annonce.get('quartier') or '').lower()
+        type_annonce = (annonce.get('type') or '').lower()
+        prix = parse_prix(annonce.get('prix'))
+        chambres = annonce.get('chambres')
+        return [
+            recherche for recherche in self.candidats(quartier, type_annonce, prix)
+            if recherche.correspond(quartier, type_annonce, prix, chambres)
+        ]
+
+
+_matcher = AlertMatcher()
+_matcher_lock = threading.Lock()
+
+
+def _rafraichir_matcher(cursor):
+    """Charger dans l'index les recherches créées depuis le dernier chargement"""
+    cursor.execute('''
+        SELECT id, email, quartier, type, prix_min, prix_max, chambres_min
+        FROM recherches_sauvegardees
+        WHERE id > ?
+        ORDER BY id
+    ''', (_matcher.dernier_id,))
+    for row in cursor.fetchall():
+        _matcher.ajouter(RechercheSauvegardee(*row))
+
+
+def ajouter_recherche(email, quartier=None, type=None, prix_min=None, prix_max=None, chambres_min=None):
+    """Sauvegarder une recherche et retourner son identifiant"""
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        cursor.execute('''
+            INSERT INTO recherches_sauvegardees (
+                email, quartier, type, prix_min, prix_max, chambres_min, date_creation
+            ) VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (email, quartier, type, prix_min, prix_max, chambres_min, datetime.now().isoformat()))
+        conn.commit()
+        return cursor.lastrowid
+    except Exception as e:
+        print(f"Erreur sauvegarde recherche: {e}")
+        return None
+    finally:
+        if 'conn' in locals():
+            conn.close()
+
+
+def get_recherches(email):
+    """Récupérer les recherches sauvegardées d'un utilisateur"""
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT * FROM recherches_sauvegardees
+            WHERE email = ?
+            ORDER BY id
+        ''', (email,))
+        return [dict(row) for row in cursor.fetchall()]
+    except Exception as e:
+        print(f"Erreur récupération recherches: {e}")
+        return []
+    finally:
+        if 'conn' in locals():
+            conn.close()
+
+
+def rafraichir_recherches(cursor):
+    """Charger les nouvelles recherches sauvegardées (en début de lot d'ingestion)"""
+    with _matcher_lock:
+        _rafraichir_matcher(cursor)
+
+
+def ecrire_alertes(cursor, annonce):
+    """Écrire dans l'outbox les alertes déclenchées par une annonce insérée
+
+    Appelée dans la transaction d'ingestion : les alertes sont validées (ou
+    annulées) avec l'annonce elle-même.
+    """
+    with _matcher_lock:
+        recherches = _matcher.correspondances(annonce)
+    if not recherches:
+        return 0
+    payload = json.dumps({
+        'titre': annonce.get('titre'),
+        'prix': annonce.get('prix'),
+        'quartier': annonce.get('quartier'),
+        'type': annonce.get('type'),
+        'url': annonce.get('url')
+    }, ensure_ascii=False)
+    maintenant = datetime.now().isoformat()
+    cursor.executemany('''
+        INSERT INTO alertes_outbox (
+            recherche_id, annonce_id, email, payload, date_creation
+        ) VALUES (?, ?, ?, ?, ?)
+    ''', [(recherche.id, annonce.get('id'), recherche.email, payload, maintenant) for recherche in recherches])
+    return len(recherches)
+
+
+def notifier_console(email, payload):
+    """Notificateur local : affiche l'alerte"""
+    print(f"🔔 Alerte pour {email}: {payload['titre']} - {payload['prix']} ({payload['quartier']})")
+
+
+def drainer_outbox(envoyer=notifier_console, limite=500):
+    """Envoyer les alertes en attente et les marquer comme envoyées
+
+    L'outbox est vidée par lots de ``limite`` alertes, chacun validé
+    séparément ; une alerte en échec reste en attente pour le passage suivant.
+    """
+    total = 0
+    dernier_id = 0
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        while True:
+            cursor.execute('''
+                SELECT id, email, payload FROM alertes_outbox
+                WHERE date_envoi IS NULL AND id > ?
+                ORDER BY id
+                LIMIT ?
+            ''', (dernier_id, limite))
+            rows = cursor.fetchall()
+            envoyees = []
+            for row in rows:
+                try:
+                    envoyer(row['email'], json.loads(row['payload']))
+                    envoyees.append((datetime.now().isoformat(), row['id']))
+                except Exception as e:
+                    print(f"Erreur envoi alerte {row['id']}: {e}")
+            cursor.executemany('UPDATE alertes_outbox SET date_envoi = ? WHERE id = ?', envoyees)
+            conn.commit()
+            total += len(envoyees)
+            if len(rows) < limite:
+                return total
+            dernier_id = rows[-1]['id']
+    except Exception as e:
+        print(f"Erreur vidage outbox: {e}")
+        return total
+    finally:
+        if 'conn' in locals():
+            conn.close()
+
+
+if __name__ == "__main__":
+    # Benchmark : index inversé contre comparaison exhaustive, 100k recherches
+    import random
+    import time
+
+    quartiers = ['cocody', 'plateau', 'marcory', 'yopougon', 'treichville', 'rivera',
+                 'bingerville', 'anyama', 'koumassi', 'port-bouet', 'abobo', 'adjamé']
+    random.seed(42)
+    recherches = []
+    budgets = {'location': (50000, 1500000), 'vente': (10000000, 400000000)}
+    for i in range(1, 100001):
+        type_recherche = random.choice(['vente', 'location'])
+        recherches.append(RechercheSauvegardee(
+            i, f"user{i}@example.com",
+            quartier=None if random.random() < 0.05 else random.choice(quartiers),
+            type=type_recherche,
+            prix_max=random.randint(*budgets[type_recherche]),
+            chambres_min=random.choice([None, 1, 2, 3, 4])
+        ))
+    annonces = []
+    for _ in range(1000):
+        type_annonce = random.choice(['vente', 'location'])
+        annonces.append({
+            'quartier': random.choice(quartiers).title(),
+            'type': type_annonce,
+            'prix': str(random.randint(*budgets[type_annonce])),
+            'chambres': random.randint(0, 6)
+        })
+
+    debut = time.perf_counter()
+    matcher = AlertMatcher()
+    for recherche in recherches:
+        matcher.ajouter(recherche)
+    construction = time.perf_counter() - debut
+
+    debut = time.perf_counter()
+    total_index = sum(len(matcher.correspondances(a)) for a in annonces)
+    duree_index = time.perf_counter() - debut
+
+    debut = time.perf_counter()
+    for annonce in annonces[:100]:
+        quartier = annonce['quartier'].lower()
+        prix = parse_prix(annonce['prix'])
+        brut = [r for r in recherches if r.correspond(quartier, annonce['type'], prix, annonce['chambres'])]
+        assert {r.id for r in brut} == {r.id for r in matcher.correspondances(annonce)}
+    duree_brut = (time.perf_counter() - debut) * 10
+
+    print(f"📊 {len(recherches)} recherches, {len(annonces)} annonces")
+    print(f"   Construction de l'index : {construction * 1000:.0f} ms")
+    print(f"   Index inversé : {duree_index * 1000:.0f} ms ({duree_index / len(annonces) * 1e6:.0f} µs/annonce, {total_index} alertes)")
+    print(f"   Exhaustif (extrapolé) : {duree_brut * 1000:.0f} ms ({duree_brut / len(annonces) * 1e6:.0f} µs/annonce)")
@@ -0,0 +1,161 @@
+import threading
+import numpy as np
+from database import get_db_connection, get_db_connection_lecture, get_ingest_cursor
+
+# Percentiles de prix matérialisés
+PERCENTILES = [25, 50, 75, 90]
+
+# Cache des réponses : (paramètres) -> (curseur d'ingestion, résultat)
+_cache = {}
+_cache_lock = threading.Lock()
+TAILLE_MAX_CACHE = 256
+
+
+def calculer_agregats(quartiers, types, prix, surfaces):
+    """Calculer les agrégats de prix par (quartier, type) sur des tableaux NumPy
+
+    ``prix`` et ``surfaces`` sont des tableaux de flottants où NaN représente
+    une valeur inconnue. Retourne une liste de dicts, un par groupe.
+    """
+    cles = np.char.add(np.char.add(quartiers.astype(str), '\x1f'), types.astype(str))
+    groupes, inverse = np.unique(cles, return_inverse=True)
+    # Trier une seule fois par groupe pour découper des tranches contiguës
+    ordre = np.argsort(inverse, kind='stable')
+    bornes = np.searchsorted(inverse[ordre], np.arange(len(groupes) + 1))
+    prix_m2 = np.where(surfaces > 0, prix / np.where(surfaces > 0, surfaces, 1), np.nan)
+
+    agregats = []
+    for i, cle in enumerate(groupes):
+        indices = ordre[bornes[i]:bornes[i + 1]]
+        prix_groupe = prix[indices]
+        prix_groupe = prix_groupe[~np.isnan(prix_groupe)]
+        m2_groupe = prix_m2[indices]
+        m2_groupe = m2_groupe[~np.isnan(m2_groupe)]
+        quartier, type_annonce = str(cle).split('\x1f')
+
+        agregat = {
+            'quartier': quartier,
+            'type': type_annonce,
+            'volume': int(len(indices)),
+            'volume_prix': int(len(prix_groupe)),
+            'prix_min': None,
+            'prix_p25': None,
+            'prix_median': None,
+            'prix_p75': None,
+            'prix_p90': None,
+            'prix_max': None,
+            'prix_m2_median': float(np.median(m2_groupe)) if len(m2_groupe) else None
+        }
+        if len(prix_groupe):
+            p25, p50, p75, p90 = np.percentile(prix_groupe, PERCENTILES)
+            agregat.update({
+                'prix_min': int(prix_groupe.min()),
+                'prix_p25': float(p25),
+                'prix_median': float(p50),
+                'prix_p75': float(p75),
+                'prix_p90': float(p90),
+                'prix_max': int(prix_groupe.max())
+            })
+        agregats.append(agregat)
+    return agregats
+
+
+def _materialiser(cursor, jours=None):
+    """Recalculer dans la transaction courante les agrégats des jours donnés"""
+    if jours is None:
+        cursor.execute('SELECT DISTINCT date_publication FROM annonces')
+        jours = [row[0] for row in cursor.fetchall()]
+
+    for jour in jours:
+        if not jour:
+            continue
+        cursor.execute('''
+            SELECT quartier, type, prix_num, surface_num
+            FROM annonces
+            WHERE date_publication = ?
+        ''', (jour,))
+        rows = cursor.fetchall()
+        cursor.execute('DELETE FROM stats_prix_jour WHERE jour = ?', (jour,))
+        if not rows:
+            continue
+
+        quartiers, types, prix, surfaces = zip(*rows)
+        agregats = calculer_agregats(
+            np.array([q or '' for q in quartiers]),
+            np.array([t or '' for t in types]),
+            np.array(prix, dtype=float),
+            np.array(surfaces, dtype=float)
+        )
+        cursor.executemany('''
+            INSERT INTO stats_prix_jour (
+                jour, quartier, type, volume, volume_prix, prix_min, prix_p25,
+                prix_median, prix_p75, prix_p90, prix_max, prix_m2_median
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', [(
+            jour, a['quartier'], a['type'], a['volume'], a['volume_prix'], a['prix_min'],
+            a['prix_p25'], a['prix_median'], a['prix_p75'], a['prix_p90'], a['prix_max'],
+            a['prix_m2_median']
+        ) for a in agregats])
+
+
+def materialiser_jours(jours=None):
+    """Recalculer les agrégats de prix des jours donnés (tous si None)"""
+    try:
+        conn = get_db_connection()
+        _materialiser(conn.cursor(), jours)
+        conn.commit()
+        return True
+    except Exception as e:
+        print(f"Erreur matérialisation statistiques de prix: {e}")
+        return False
+    finally:
+        if 'conn' in locals():
+            conn.close()
+
+
+def get_statistiques_prix(quartier='', type_annonce='', depuis='', jusqu_a=''):
+    """Lire les agrégats matérialisés, mis en cache jusqu'à la prochaine ingestion"""
+    cle = (quartier, type_annonce, depuis, jusqu_a)
+    curseur = get_ingest_cursor()
+    with _cache_lock:
+        entree = _cache.get(cle)
+        if entree and entree[0] == curseur:
+            return entree[1]
+
+    conditions = []
+    params = []
+    if quartier:
+        conditions.append('lower(quartier) = ?')
+        params.append(quartier.lower())
+    if type_annonce:
+        conditions.append('lower(type) = ?')
+        params.append(type_annonce.lower())
+    if depuis:
+        conditions.append('jour >= ?')
+        params.append(depuis)
+    if jusqu_a:
+        conditions.append('jour <= ?')
+        params.append(jusqu_a)
+
+    query = 'SELECT * FROM stats_prix_jour'
+    if conditions:
+        query += ' WHERE ' + ' AND '.join(conditions)
+    query += ' ORDER BY jour DESC, quartier, type'
+
+    try:
+        conn = get_db_connection_lecture()
+        cursor = conn.cursor()
+        cursor.execute(query, params)
+        statistiques = [dict(row) for row in cursor.fetchall()]
+    except Exception as e:
+        print(f"Erreur récupération statistiques de prix: {e}")
+        return []
+    finally:
+        if 'conn' in locals():
+            conn.close()
+
+    with _cache_lock:
+        if len(_cache) >= TAILLE_MAX_CACHE:
+            _cache.clear()
+        _cache[cle] = (curseur, statistiques)
+    return statistiques
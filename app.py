@@ -1,16 +1,23 @@
-from flask import Flask, render_template, jsonify, request
-import requests
+from flask import Flask, render_template, jsonify, request, Response, stream_with_context
 from datetime import datetime, timedelta
 import json
 import os
-from database import get_annonces_du_jour, get_all_annonces, get_statistiques, init_database
+from database import (get_payloads, get_statistiques, init_database, iter_annonces,
+                      get_annonces_changes, get_ingest_cursor, get_annonces_par_ids,
+                      get_annonces_champs, get_annonce as get_annonce_db, get_contact, normaliser_telephone,
+                      get_catalogue_quartiers, COLONNES_API, CHAMPS_RESUME)
 import threading
+from diffusion import hub
+from compression import init_compression
 
 # Configuration pour Render
 app = Flask(__name__, 
            template_folder='templates',
            static_folder='static')
 
+# Compression gzip/brotli des réponses JSON et assets précompressés
+init_compression(app)
+
 # Configuration de la base de données
 DATABASE_URL = os.getenv('DATABASE_URL', 'annonces.db')
 
@@ -33,6 +40,66 @@ def index():
     ensure_database_initialized()
     return render_template('index.html')
 
+def reponse_liste_annonces(payloads, **champs):
+    """Assembler une réponse JSON en concaténant les fragments pré-sérialisés des annonces"""
+    champs['total'] = len(payloads)
+    entete = json.dumps(champs, ensure_ascii=False, sort_keys=True)[:-1]
+    if payloads and isinstance(payloads[0], bytes):
+        # Fragments déjà encodés en UTF-8 (index en mémoire) : pas de réencodage du corps
+        corps = entete.encode() + b',"annonces":[' + b','.join(payloads) + b']}'
+    else:
+        corps = entete + ',"annonces":[' + ','.join(payloads) + ']}'
+    return Response(corps, mimetype='application/json')
+
+def champs_demandes():
+    """Lire ``fields=`` / ``format=resume`` ; retourne (champs, tronquer) ou (None, False) pour le détail complet"""
+    if request.args.get('format', '').lower() == 'resume':
+        return list(CHAMPS_RESUME), True
+    fields = request.args.get('fields', '')
+    if not fields:
+        return None, False
+    champs = [champ.strip() for champ in fields.split(',') if champ.strip()]
+    inconnus = [champ for champ in champs if champ not in COLONNES_API]
+    if inconnus:
+        raise ValueError(f"Champs inconnus : {', '.join(inconnus)}")
+    if 'id' not in champs:
+        champs.insert(0, 'id')
+    return champs, False
+
+def plage_demandee():
+    """Plage de dates de publication depuis=/jusqu_a= (AAAA-MM-JJ), ValueError si invalide"""
+    plage = []
+    for param in ('depuis', 'jusqu_a'):
+        valeur = request.args.get(param, '')
+        if valeur:
+            try:
+                valeur = datetime.strptime(valeur, '%Y-%m-%d').strftime('%Y-%m-%d')
+            except ValueError:
+                raise ValueError(f'Paramètre {param} invalide (format AAAA-MM-JJ attendu)')
+        plage.append(valeur or None)
+    return plage
+
+def horodatage_since(valeur):
+    """Horodatage ISO 8601 (suffixe Z ou décalage accepté) au format de date_recuperation,
+    heure locale sans fuseau ; ValueError si invalide"""
+    if valeur[-1:] in ('Z', 'z'):
+        # datetime.fromisoformat n'accepte pas le suffixe Z avant Python 3.11
+        valeur = valeur[:-1] + '+00:00'
+    instant = datetime.fromisoformat(valeur)
+    if instant.tzinfo is not None:
+        instant = instant.astimezone().replace(tzinfo=None)
+    return instant.isoformat()
+
+def payloads_annonces(quartier, type_annonce, date_publication=None, depuis=None, jusqu_a=None):
+    """Fragments JSON des annonces, projetés si fields=/format=resume est demandé"""
+    champs, tronquer = champs_demandes()
+    if champs is None:
+        return get_payloads(quartier, type_annonce, date_publication=date_publication,
+                            depuis=depuis, jusqu_a=jusqu_a)
+    annonces = get_annonces_champs(champs, quartier, type_annonce, date_publication, tronquer,
+                                   depuis=depuis, jusqu_a=jusqu_a)
+    return [json.dumps(annonce, ensure_ascii=False, separators=(',', ':')) for annonce in annonces]
+
 @app.route('/api/annonces')
 def get_annonces():
     """API pour récupérer toutes les annonces"""
@@ -40,21 +107,55 @@ def get_annonces():
     quartier = request.args.get('quartier', '').lower()
     type_annonce = request.args.get('type', '').lower()
     
-    annonces = get_all_annonces()
-    
-    # Filtrer par quartier
-    if quartier:
-        annonces = [a for a in annonces if quartier in a['quartier'].lower()]
-    
-    # Filtrer par type
-    if type_annonce:
-        annonces = [a for a in annonces if type_annonce in a['type'].lower()]
+    try:
+        depuis, jusqu_a = plage_demandee()
+        payloads = payloads_annonces(quartier, type_annonce, depuis=depuis, jusqu_a=jusqu_a)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
-    return jsonify({
-        'annonces': annonces,
-        'total': len(annonces),
-        'date': datetime.now().isoformat()
-    })
+    return reponse_liste_annonces(payloads, date=datetime.now().isoformat())
+
+@app.route('/api/annonces/export')
+def export_annonces():
+    """Export en flux du catalogue complet (NDJSON ou tableau JSON)"""
+    ensure_database_initialized()
+    format_export = request.args.get('format', 'ndjson').lower()
+    quartier = request.args.get('quartier', '').lower()
+    type_annonce = request.args.get('type', '').lower()
+    since = request.args.get('since', '')
+
+    if format_export not in ('ndjson', 'json'):
+        return jsonify({'error': 'Format invalide (ndjson ou json)'}), 400
+
+    if since:
+        try:
+            since = horodatage_since(since)
+        except ValueError:
+            return jsonify({'error': 'Paramètre since invalide (format ISO 8601 attendu)'}), 400
+
+    try:
+        depuis, jusqu_a = plage_demandee()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    lots = iter_annonces(quartier, type_annonce, since or None, depuis=depuis, jusqu_a=jusqu_a)
+
+    def generer_ndjson():
+        for lot in lots:
+            yield ''.join(json.dumps(annonce, ensure_ascii=False) + '\n' for annonce in lot)
+
+    def generer_json():
+        total = 0
+        yield '{"annonces":['
+        for lot in lots:
+            chunk = ','.join(json.dumps(annonce, ensure_ascii=False) for annonce in lot)
+            yield (',' if total else '') + chunk
+            total += len(lot)
+        yield '],"total":%d,"date":%s}' % (total, json.dumps(datetime.now().isoformat()))
+
+    if format_export == 'ndjson':
+        return Response(stream_with_context(generer_ndjson()), mimetype='application/x-ndjson')
+    return Response(stream_with_context(generer_json()), mimetype='application/json')
 
 @app.route('/api/annonces/du-jour')
 def get_annonces_du_jour_api():
@@ -63,40 +164,162 @@ def get_annonces_du_jour_api():
     quartier = request.args.get('quartier', '').lower()
     type_annonce = request.args.get('type', '').lower()
     
-    annonces = get_annonces_du_jour()
+    try:
+        champs, tronquer = champs_demandes()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    if champs is None or tronquer:
+        # Détail complet ou format=resume : servis par l'index en mémoire
+        from index_jour import rechercher_du_jour
+        payloads, curseur = rechercher_du_jour(quartier, type_annonce, resume=tronquer)
+    else:
+        curseur = get_ingest_cursor()
+        payloads = payloads_annonces(quartier, type_annonce, date_publication=datetime.now().strftime('%Y-%m-%d'))
     
-    # Filtrer par quartier
-    if quartier:
-        annonces = [a for a in annonces if quartier in a['quartier'].lower()]
+    return reponse_liste_annonces(
+        payloads,
+        date=datetime.now().strftime('%Y-%m-%d'),
+        ville='Abidjan',
+        cursor=curseur
+    )
+
+@app.route('/api/annonces/changes')
+def get_annonces_changes_api():
+    """API pour récupérer les annonces ajoutées depuis un curseur"""
+    ensure_database_initialized()
+    try:
+        since = int(request.args.get('since', 0))
+        limit = int(request.args.get('limit', 500))
+    except ValueError:
+        return jsonify({'error': 'Paramètres since/limit invalides'}), 400
+    if limit <= 0:
+        # limit=0 bouclerait (has_more toujours vrai), -1 désactiverait la limite SQLite
+        return jsonify({'error': 'Paramètre limit invalide (entier positif attendu)'}), 400
+    limit = min(limit, 5000)
     
-    # Filtrer par type
-    if type_annonce:
-        annonces = [a for a in annonces if type_annonce in a['type'].lower()]
+    annonces, curseur = get_annonces_changes(since, limit)
     
     return jsonify({
         'annonces': annonces,
         'total': len(annonces),
-        'date': datetime.now().strftime('%Y-%m-%d'),
-        'ville': 'Abidjan'
+        'cursor': curseur,
+        'has_more': len(annonces) == limit
     })
 
+@app.route('/api/annonces/flux')
+def flux_annonces():
+    """Flux SSE des nouvelles annonces, alimenté par l'ingestion (aucune requête SQL)"""
+    response = Response(stream_with_context(hub.flux_sse()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
 @app.route('/api/annonces/<int:annonce_id>')
 def get_annonce(annonce_id):
-    """API pour récupérer une annonce spécifique"""
-    # À implémenter : recherche dans la base de données
-    return jsonify({'error': 'Fonction à implémenter'}), 404
+    """API pour récupérer une annonce spécifique (détail complet, contacts inclus)"""
+    ensure_database_initialized()
+    annonce = get_annonce_db(annonce_id)
+    if annonce is None:
+        return jsonify({'error': 'Annonce introuvable'}), 404
+    return jsonify({'annonce': annonce})
 
-@app.route('/api/quartiers')
-def get_quartiers():
-    """API pour récupérer la liste des quartiers"""
-    # À implémenter : récupération depuis la base de données
-    quartiers_abidjan = ['Plateau', 'Cocody', 'Treichville', 'Marcory', 'Yopougon', 
-                        'Bingerville', 'Anyama', 'Koumassi', 'Port-Bouet', 'Rivera']
+@app.route('/api/annonces/<int:annonce_id>/similaires')
+def get_annonces_similaires(annonce_id):
+    """API pour récupérer les annonces similaires à une annonce"""
+    ensure_database_initialized()
+    from similarite import get_annonces_similaires_ids
+    try:
+        k = max(1, min(int(request.args.get('k', 6)), 50))
+    except ValueError:
+        return jsonify({'error': 'Paramètre k invalide'}), 400
+    
+    ids = get_annonces_similaires_ids(annonce_id, k)
+    if ids is None:
+        return jsonify({'error': 'Annonce introuvable'}), 404
+    
+    annonces = get_annonces_par_ids(ids)
     return jsonify({
-        'quartiers': quartiers_abidjan,
-        'total': len(quartiers_abidjan)
+        'annonces': annonces,
+        'total': len(annonces),
+        'annonce_id': annonce_id
     })
 
+@app.route('/api/contacts/<path:telephone>/annonces')
+def get_annonces_contact(telephone):
+    """API pour récupérer toutes les annonces d'un contact (numéro sous toute forme)"""
+    ensure_database_initialized()
+    numero = normaliser_telephone(telephone)
+    if numero is None:
+        return jsonify({'error': 'Numéro de téléphone invalide'}), 400
+    contact = get_contact(numero)
+    if contact is None:
+        return jsonify({'error': 'Contact introuvable'}), 404
+    # nb_annonces compte aussi les annonces archivées : la liste doit les inclure
+    return reponse_liste_annonces(get_payloads(telephone=numero, archive=True), contact=contact)
+
+# Catalogue des quartiers sérialisé : (version, jour) -> (etag, corps)
+_cache_quartiers = {}
+
+@app.route('/api/quartiers')
+def get_quartiers():
+    """API pour récupérer les quartiers présents dans les données, avec compteurs et fourchettes de prix"""
+    ensure_database_initialized()
+    today = datetime.now().strftime('%Y-%m-%d')
+    cle = (get_ingest_cursor(), today)
+    
+    entree = _cache_quartiers.get(cle)
+    if entree is None:
+        quartiers = get_catalogue_quartiers()
+        corps = json.dumps({'quartiers': quartiers, 'total': len(quartiers), 'date': today}, ensure_ascii=False)
+        entree = (f"quartiers-{cle[0]}-{today}", corps)
+        _cache_quartiers.clear()
+        _cache_quartiers[cle] = entree
+    
+    response = Response(entree[1], mimetype='application/json')
+    response.set_etag(entree[0])
+    # Revalidation à chaque chargement : 304 tant que le catalogue n'a pas changé
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+@app.route('/api/recherches', methods=['POST'])
+def creer_recherche():
+    """API pour sauvegarder une recherche (alerte sur les nouvelles annonces)"""
+    ensure_database_initialized()
+    from alertes import ajouter_recherche
+    data = request.get_json(silent=True) or {}
+    email = (data.get('email') or '').strip()
+    if not email:
+        return jsonify({'error': 'Email requis'}), 400
+    try:
+        criteres = {
+            cle: int(data[cle]) if data.get(cle) not in (None, '') else None
+            for cle in ('prix_min', 'prix_max', 'chambres_min')
+        }
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Critères numériques invalides'}), 400
+    
+    recherche_id = ajouter_recherche(
+        email,
+        quartier=data.get('quartier') or None,
+        type=data.get('type') or None,
+        **criteres
+    )
+    if recherche_id is None:
+        return jsonify({'error': 'Impossible de sauvegarder la recherche'}), 500
+    return jsonify({'id': recherche_id, 'status': 'success'}), 201
+
+@app.route('/api/recherches')
+def lister_recherches():
+    """API pour récupérer les recherches sauvegardées d'un utilisateur"""
+    ensure_database_initialized()
+    from alertes import get_recherches
+    email = request.args.get('email', '').strip()
+    if not email:
+        return jsonify({'error': 'Email requis'}), 400
+    recherches = get_recherches(email)
+    return jsonify({'recherches': recherches, 'total': len(recherches)})
+
 @app.route('/api/statistiques')
 def get_statistiques_api():
     """API pour récupérer les statistiques"""
@@ -114,6 +337,22 @@ def get_statistiques_api():
             'quartiers_actifs': 0
         }})
 
+@app.route('/api/statistiques/prix')
+def get_statistiques_prix_api():
+    """API pour récupérer les prix médians et percentiles par quartier, type et jour"""
+    ensure_database_initialized()
+    from analytics import get_statistiques_prix
+    quartier = request.args.get('quartier', '')
+    type_annonce = request.args.get('type', '')
+    depuis = request.args.get('depuis', '')
+    jusqu_a = request.args.get('jusqu_a', '')
+    
+    statistiques = get_statistiques_prix(quartier, type_annonce, depuis, jusqu_a)
+    return jsonify({
+        'statistiques': statistiques,
+        'total': len(statistiques)
+    })
+
 # Route health check pour Render
 @app.route('/health')
 def health_check():
@@ -0,0 +1,159 @@
+import os
+import sqlite3
+import time
+from datetime import datetime, timedelta
+from database import get_db_path
+
+# Âge (en jours de publication) au-delà duquel une annonce part en archive
+RETENTION_JOURS = int(os.getenv('RETENTION_JOURS', 90))
+
+# Nombre d'annonces déplacées par transaction
+TAILLE_LOT_ARCHIVAGE = 1000
+
+# Pause entre deux lots pour laisser passer lecteurs et scrapers
+PAUSE_ENTRE_LOTS = 0.05
+
+
+def get_archive_path():
+    """Chemin de la base d'archive (ARCHIVE_DATABASE_URL ou <base>_archive.db)"""
+    archive = os.getenv('ARCHIVE_DATABASE_URL')
+    if archive:
+        return archive[10:] if archive.startswith('sqlite:///') else archive
+    base, extension = os.path.splitext(get_db_path())
+    return f"{base}_archive{extension or '.db'}"
+
+
+def date_limite(age_jours=RETENTION_JOURS):
+    """Date de publication en deçà de laquelle les annonces sont archivées"""
+    return (datetime.now() - timedelta(days=age_jours)).strftime('%Y-%m-%d')
+
+
+def archive_disponible():
+    return os.path.exists(get_archive_path())
+
+
+def plage_requiert_archive(depuis, jusqu_a=None):
+    """Une plage de dates ``depuis``..``jusqu_a`` peut-elle toucher l'archive ?
+
+    Sans ``depuis``, une plage bornée par ``jusqu_a`` seul est ouverte vers le
+    passé ; sans aucune borne, la liste par défaut ne lit que la table chaude.
+    """
+    if not (depuis or jusqu_a) or not archive_disponible():
+        return False
+    return not depuis or depuis < date_limite()
+
+
+def attacher_archive(conn):
+    """Attacher la base d'archive à une connexion sous le schéma ``archive``"""
+    conn.execute('ATTACH DATABASE ? AS archive', (get_archive_path(),))
+
+
+def colonnes_annonces(cursor, schema='main'):
+    cursor.execute(f'PRAGMA {schema}.table_info(annonces)')
+    return [column[1] for column in cursor.fetchall()]
+
+
+def source_annonces(cursor, avec_archive=False):
+    """Clause FROM des annonces : table chaude seule, ou chaude + archive
+
+    Avec ``avec_archive``, la connexion doit avoir été préparée avec attacher_archive().
+    """
+    if not avec_archive:
+        return 'annonces'
+    colonnes = colonnes_annonces(cursor)
+    # Colonnes ajoutées à la table chaude depuis le dernier archivage : NULL côté archive
+    archivees = set(colonnes_annonces(cursor, 'archive'))
+    colonnes_archive = [c if c in archivees else f'NULL AS {c}' for c in colonnes]
+    return (f"(SELECT {', '.join(colonnes)} FROM main.annonces "
+            f"UNION ALL SELECT {', '.join(colonnes_archive)} FROM archive.annonces) AS annonces")
+
+
+def _preparer_archive(cursor):
+    """Créer la table d'archive avec le schéma de la table chaude (et ses colonnes ajoutées)"""
+    cursor.execute("SELECT sql FROM main.sqlite_master WHERE type='table' AND name='annonces'")
+    sql_creation = cursor.fetchone()[0]
+    cursor.execute(sql_creation.replace('CREATE TABLE annonces', 'CREATE TABLE IF NOT EXISTS archive.annonces', 1))
+    archivees = set(colonnes_annonces(cursor, 'archive'))
+    cursor.execute('PRAGMA main.table_info(annonces)')
+    for column in cursor.fetchall():
+        if column[1] not in archivees:
+            cursor.execute(f'ALTER TABLE archive.annonces ADD COLUMN {column[1]} {column[2]}')
+    cursor.execute('CREATE INDEX IF NOT EXISTS archive.idx_archive_date_publication ON annonces(date_publication)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS archive.idx_archive_contact_telephone ON annonces(contact_telephone)')
+    # Archive antérieure à la table des URLs archivées : la remplir une fois
+    cursor.execute('SELECT EXISTS(SELECT 1 FROM main.urls_archivees)')
+    if not cursor.fetchone()[0]:
+        cursor.execute('INSERT OR IGNORE INTO main.urls_archivees (url) SELECT url FROM archive.annonces WHERE url IS NOT NULL')
+
+
+def archiver(age_jours=RETENTION_JOURS, taille_lot=TAILLE_LOT_ARCHIVAGE):
+    """Déplacer par lots les annonces plus anciennes que ``age_jours`` vers l'archive
+
+    Chaque lot est copié (INSERT OR IGNORE) puis supprimé de la table chaude :
+    en cas d'interruption, le lot sera simplement recopié au prochain passage.
+    Les URLs archivées restent dans ``urls_archivees`` pour que save_annonces
+    ne réinsère pas une annonce déjà archivée.
+    Rien n'est archivé tant que des backfills de migration sont en attente :
+    ils ne parcourent que la table chaude.
+    Retourne le nombre d'annonces archivées.
+    """
+    limite = date_limite(age_jours)
+    total = 0
+    try:
+        conn = sqlite3.connect(get_db_path(), isolation_level=None, timeout=30)
+        cursor = conn.cursor()
+        cursor.execute('SELECT COUNT(*) FROM migrations_backfill WHERE termine = 0')
+        if cursor.fetchone()[0]:
+            print("⏳ Archivage reporté : backfills de migration en cours")
+            return 0
+        attacher_archive(conn)
+        _preparer_archive(cursor)
+        colonnes = ', '.join(colonnes_annonces(cursor))
+
+        while True:
+            cursor.execute('BEGIN IMMEDIATE')
+            try:
+                # La dernière annonce insérée reste toujours dans la table chaude :
+                # MAX(id) et MAX(ingest_seq) ne doivent jamais reculer
+                cursor.execute('''
+                    SELECT rowid FROM main.annonces
+                    WHERE date_publication < ?
+                      AND rowid < (SELECT MAX(rowid) FROM main.annonces)
+                      AND ingest_seq < (SELECT MAX(ingest_seq) FROM main.annonces)
+                    ORDER BY date_publication
+                    LIMIT ?
+                ''', (limite, taille_lot))
+                rowids = [row[0] for row in cursor.fetchall()]
+                if rowids:
+                    placeholders = ','.join('?' * len(rowids))
+                    cursor.execute(f'''
+                        INSERT OR IGNORE INTO archive.annonces ({colonnes})
+                        SELECT {colonnes} FROM main.annonces WHERE rowid IN ({placeholders})
+                    ''', rowids)
+                    cursor.execute(f'''
+                        INSERT OR IGNORE INTO main.urls_archivees (url)
+                        SELECT url FROM main.annonces WHERE rowid IN ({placeholders}) AND url IS NOT NULL
+                    ''', rowids)
+                    cursor.execute(f'DELETE FROM main.annonces WHERE rowid IN ({placeholders})', rowids)
+                cursor.execute('COMMIT')
+            except Exception:
+                cursor.execute('ROLLBACK')
+                raise
+            if not rowids:
+                break
+            total += len(rowids)
+            time.sleep(PAUSE_ENTRE_LOTS)
+
+        if total:
+            print(f"🗄️ {total} annonces antérieures au {limite} archivées dans {get_archive_path()}")
+        return total
+    except Exception as e:
+        print(f"❌ Erreur archivage : {e}")
+        return total
+    finally:
+        if 'conn' in locals():
+            conn.close()
+
+
+if __name__ == "__main__":
+    archiver()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Génération des assets statiques fingerprintés et précompressés (gzip, brotli)
+Exécuté à la construction sur Render : python build_static.py
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import shutil
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+DIST_DIR = os.path.join(STATIC_DIR, 'dist')
+
+# Assets référencés par les templates
+ASSETS = ['css/style.css', 'js/main.js']
+
+
+def construire():
+    """Copier chaque asset sous un nom contenant son hash, avec ses variantes .gz et .br"""
+    shutil.rmtree(DIST_DIR, ignore_errors=True)
+    manifeste = {}
+
+    for asset in ASSETS:
+        with open(os.path.join(STATIC_DIR, asset), 'rb') as f:
+            contenu = f.read()
+
+        empreinte = hashlib.sha256(contenu).hexdigest()[:12]
+        base, extension = os.path.splitext(asset)
+        nom = f"{base}.{empreinte}{extension}"
+        chemin = os.path.join(DIST_DIR, nom)
+        os.makedirs(os.path.dirname(chemin), exist_ok=True)
+
+        with open(chemin, 'wb') as f:
+            f.write(contenu)
+        with open(chemin + '.gz', 'wb') as f:
+            f.write(gzip.compress(contenu, compresslevel=9))
+        tailles = f"gzip {os.path.getsize(chemin + '.gz')} o"
+        if brotli is not None:
+            with open(chemin + '.br', 'wb') as f:
+                f.write(brotli.compress(contenu, quality=11))
+            tailles += f", brotli {os.path.getsize(chemin + '.br')} o"
+
+        manifeste[asset] = nom
+        print(f"📦 {asset} → dist/{nom} ({len(contenu)} o, {tailles})")
+
+    with open(os.path.join(DIST_DIR, 'manifest.json'), 'w', encoding='utf-8') as f:
+        json.dump(manifeste, f, indent=2)
+    return manifeste
+
+
+if __name__ == "__main__":
+    construire()
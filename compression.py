@@ -0,0 +1,135 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from flask import request, send_from_directory, url_for
+
+try:
+    import brotli
+except ImportError:  # Brotli optionnel : gzip seul si le module est absent
+    brotli = None
+
+# Taille minimale (octets) d'une réponse JSON pour qu'elle soit compressée
+SEUIL_COMPRESSION = 1024
+
+# Taille maximale du cache des corps compressés (octets)
+TAILLE_MAX_CACHE = 32 * 1024 * 1024
+
+# Dossier des assets statiques générés par build_static.py
+DOSSIER_DIST = 'dist'
+
+_cache = OrderedDict()
+_cache_taille = 0
+_cache_lock = threading.Lock()
+
+
+def choisir_encodage(accept_encoding):
+    """Choisir l'encodage à partir de l'en-tête Accept-Encoding (br > gzip)"""
+    encodages = {
+        partie.split(';')[0].strip().lower()
+        for partie in accept_encoding.split(',')
+        if not partie.strip().endswith('q=0')
+    }
+    if brotli is not None and 'br' in encodages:
+        return 'br'
+    if 'gzip' in encodages:
+        return 'gzip'
+    return None
+
+
+def compresser(corps, encodage):
+    """Compresser un corps de réponse, en réutilisant le résultat pour un corps identique"""
+    global _cache_taille
+    cle = (hashlib.blake2b(corps, digest_size=16).digest(), encodage)
+    with _cache_lock:
+        compresse = _cache.get(cle)
+        if compresse is not None:
+            _cache.move_to_end(cle)
+            return compresse
+
+    if encodage == 'br':
+        compresse = brotli.compress(corps, quality=5)
+    else:
+        compresse = gzip.compress(corps, compresslevel=6)
+
+    with _cache_lock:
+        if cle not in _cache:
+            _cache[cle] = compresse
+            _cache_taille += len(compresse)
+            while _cache_taille > TAILLE_MAX_CACHE and _cache:
+                _, ancien = _cache.popitem(last=False)
+                _cache_taille -= len(ancien)
+    return compresse
+
+
+def compresser_reponse(response):
+    """Compresser les réponses JSON au-delà du seuil selon Accept-Encoding"""
+    if (response.status_code != 200
+            or response.mimetype != 'application/json'
+            or response.is_streamed
+            or response.direct_passthrough
+            or 'Content-Encoding' in response.headers):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    encodage = choisir_encodage(request.headers.get('Accept-Encoding', ''))
+    if encodage is None:
+        return response
+
+    corps = response.get_data()
+    if len(corps) < SEUIL_COMPRESSION:
+        return response
+
+    response.set_data(compresser(corps, encodage))
+    response.headers['Content-Encoding'] = encodage
+    etag, faible = response.get_etag()
+    if etag:
+        # Représentation différente : un ETag par encodage, sans quoi un cache
+        # partagé pourrait servir le corps compressé à un client qui ne l'accepte pas
+        response.set_etag(f"{etag}-{encodage}", weak=faible)
+        # La vue n'a comparé If-None-Match qu'à l'ETag d'origine
+        response.make_conditional(request)
+    return response
+
+
+def charger_manifeste(static_folder):
+    """Lire le manifeste des assets fingerprintés (vide si build_static.py n'a pas tourné)"""
+    chemin = os.path.join(static_folder, DOSSIER_DIST, 'manifest.json')
+    try:
+        with open(chemin, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def init_compression(app):
+    """Activer la compression des réponses et les assets statiques précompressés"""
+    manifeste = charger_manifeste(app.static_folder)
+    dossier_dist = os.path.join(app.static_folder, DOSSIER_DIST)
+
+    @app.template_global()
+    def static_url(filename):
+        """URL fingerprintée d'un asset statique (URL classique à défaut)"""
+        if filename in manifeste:
+            return url_for('static_dist', filename=manifeste[filename])
+        return url_for('static', filename=filename)
+
+    @app.route('/static/dist/<path:filename>')
+    def static_dist(filename):
+        """Servir un asset fingerprinté, précompressé si le client l'accepte"""
+        encodage = choisir_encodage(request.headers.get('Accept-Encoding', ''))
+        extension = {'br': '.br', 'gzip': '.gz'}.get(encodage)
+        if extension and os.path.isfile(os.path.join(dossier_dist, filename + extension)):
+            response = send_from_directory(dossier_dist, filename + extension, max_age=31536000)
+            response.headers['Content-Encoding'] = encodage
+            response.mimetype = 'text/css' if filename.endswith('.css') else 'application/javascript'
+        else:
+            response = send_from_directory(dossier_dist, filename, max_age=31536000)
+        # Le nom contient le hash du contenu : cache immuable
+        response.cache_control.immutable = True
+        response.vary.add('Accept-Encoding')
+        return response
+
+    app.after_request(compresser_reponse)
@@ -1,15 +1,120 @@
 import sqlite3
 from datetime import datetime
+import json
 import os
+import re
+from diffusion import hub
 
 DATABASE_URL = os.getenv('DATABASE_URL', 'annonces.db')
 
+# Colonnes renseignées par les scrapers
+COLONNES_ANNONCE = [
+    'id', 'titre', 'description', 'prix', 'type', 'quartier',
+    'surface', 'chambres', 'date_publication', 'source', 'url',
+    'contact_nom', 'contact_telephone', 'contact_email', 'contact_whatsapp'
+]
+
+# Colonnes exposées par l'API (hors colonnes internes)
+COLONNES_API = COLONNES_ANNONCE + ['date_recuperation', 'ingest_seq']
+SELECT_API = ', '.join(COLONNES_API)
+
+# Représentation compacte des listes : sans contacts, description tronquée
+CHAMPS_RESUME = ['id', 'titre', 'prix', 'type', 'quartier', 'surface', 'chambres',
+                 'date_publication', 'description']
+LONGUEUR_DESCRIPTION_RESUME = 160
+
+# Prix maximum plausible (FCFA) ; au-delà, le texte ne contenait pas qu'un prix
+PRIX_MAX = 10 ** 12
+
+# Version du format JSON pré-sérialisé (payload_json) ; à incrémenter si le format change
+# (2 : plus d'image par défaut dans les fragments, appliquée par le front)
+PAYLOAD_VERSION = 2
+
+# Fusion d'un agrégat (quartier, type, nb, prix_min, prix_max, dernier_jour, nb_dernier_jour)
+# dans le catalogue des quartiers : ingestion (une annonce) et backfill (un lot)
+UPSERT_CATALOGUE_QUARTIERS = '''
+    INSERT INTO catalogue_quartiers (quartier, type, nb_annonces, prix_min, prix_max, dernier_jour, nb_dernier_jour)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(quartier, type) DO UPDATE SET
+        nb_annonces = nb_annonces + excluded.nb_annonces,
+        prix_min = min(COALESCE(prix_min, excluded.prix_min), COALESCE(excluded.prix_min, prix_min)),
+        prix_max = max(COALESCE(prix_max, excluded.prix_max), COALESCE(excluded.prix_max, prix_max)),
+        nb_dernier_jour = CASE
+            WHEN excluded.dernier_jour = dernier_jour THEN nb_dernier_jour + excluded.nb_dernier_jour
+            WHEN dernier_jour IS NULL OR excluded.dernier_jour > dernier_jour THEN excluded.nb_dernier_jour
+            ELSE nb_dernier_jour
+        END,
+        dernier_jour = max(COALESCE(dernier_jour, excluded.dernier_jour), COALESCE(excluded.dernier_jour, dernier_jour))
+'''
+
 def get_db_path():
     """Extraire le chemin du fichier de la DATABASE_URL"""
     if DATABASE_URL.startswith('sqlite:///'):
         return DATABASE_URL[10:]  # Supprime 'sqlite:///'
     return DATABASE_URL
 
+def parse_prix(prix):
+    """Convertir un prix texte ('45 000 000', '2.5 millions FCFA') en FCFA entier
+
+    Seul le premier nombre (séparateurs de milliers compris) est lu : la suite
+    du texte peut contenir caution, durée ou numéro de téléphone. None si le
+    montant est hors de [0, PRIX_MAX].
+    """
+    if prix is None:
+        return None
+    if isinstance(prix, (int, float)):
+        valeur = int(prix)
+    else:
+        texte = str(prix).lower()
+        millions = re.search(r'(\d+(?:[.,]\d+)?)\s*(?:millions?|m\b)', texte)
+        nombre = re.search(r'\d{1,3}(?:[ .,\u00a0\u202f]\d{3})+(?!\d)|\d+', texte)
+        if millions:
+            valeur = int(float(millions.group(1).replace(',', '.')) * 1000000)
+        elif nombre:
+            valeur = int(re.sub(r'\D', '', nombre.group(0)))
+        else:
+            return None
+    return valeur if 0 <= valeur <= PRIX_MAX else None
+
+def parse_surface(surface):
+    """Convertir une surface texte ('120 m²') en mètres carrés"""
+    if surface is None:
+        return None
+    if isinstance(surface, (int, float)):
+        return float(surface)
+    nombre = re.search(r'\d+(?:[.,]\d+)?', str(surface))
+    return float(nombre.group(0).replace(',', '.')) if nombre else None
+
+def normaliser_telephone(telephone):
+    """Normaliser un numéro ivoirien au format E.164 (+225 suivi de 10 chiffres)
+
+    Accepte '+225 07 12 34 56', '22507123456', '0712345678', '07123456'...
+    Les anciens numéros à 8 chiffres reçoivent le préfixe de la renumérotation
+    de 2021 : 01/05/07 selon le 2e chiffre pour les mobiles, 27 pour les fixes.
+    Retourne None si le numéro n'est pas reconnu.
+    """
+    if not telephone:
+        return None
+    chiffres = re.sub(r'\D', '', str(telephone))
+    if chiffres.startswith('00'):
+        chiffres = chiffres[2:]
+    if chiffres.startswith('225') and len(chiffres) in (11, 13):
+        chiffres = chiffres[3:]
+    if len(chiffres) == 8:
+        if chiffres[0] in '23':
+            prefixe = '27'
+        else:
+            prefixe = '01' if chiffres[1] in '0123' else '05' if chiffres[1] in '456' else '07'
+        chiffres = prefixe + chiffres
+    if len(chiffres) != 10 or chiffres[:2] not in ('01', '05', '07', '21', '25', '27'):
+        return None
+    return '+225' + chiffres
+
+def serialiser_annonce(annonce):
+    """Sérialiser une annonce en fragment JSON (une seule fois, à l'ingestion)"""
+    donnees = {colonne: annonce.get(colonne) for colonne in COLONNES_API}
+    return json.dumps(donnees, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+
 def get_db_connection():
     """Obtenir une connexion à la base de données"""
     db_path = get_db_path()
@@ -17,180 +122,484 @@ def get_db_connection():
     conn.row_factory = sqlite3.Row  # Pour pouvoir accéder aux colonnes par nom
     return conn
 
+def get_db_connection_lecture():
+    """Connexion de lecture du tier web : snapshot publié, base principale à défaut"""
+    from snapshot import ouvrir_snapshot
+    conn = ouvrir_snapshot()
+    return conn if conn is not None else get_db_connection()
+
 def init_database():
-    """Initialise la base de données et crée les tables si nécessaire"""
+    """Initialise la base de données et applique les migrations de schéma nécessaires"""
     try:
         db_path = get_db_path()
         # Créer le dossier parent si nécessaire
         os.makedirs(os.path.dirname(db_path) if os.path.dirname(db_path) else '.', exist_ok=True)
         
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        
-        # Supprimer l'ancienne table si elle existe (pour la migration)
-        cursor.execute('DROP TABLE IF EXISTS annonces_old')
-        
-        # Vérifier si la colonne contact existe déjà
-        cursor.execute("PRAGMA table_info(annonces)")
-        columns = [column[1] for column in cursor.fetchall()]
-        
-        # Si la table n'existe pas ou n'a pas la colonne contact, la recréer
-        if 'contact_nom' not in columns:
-            # Sauvegarder les données existantes si la table existe
-            cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='annonces'")
-            table_exists = cursor.fetchone()
-            
-            if table_exists:
-                cursor.execute('ALTER TABLE annonces RENAME TO annonces_old')
-            
-            # Créer la nouvelle table avec les colonnes de contact
-            cursor.execute('''
-                CREATE TABLE annonces (
-                    id INTEGER PRIMARY KEY,
-                    titre TEXT,
-                    description TEXT,
-                    prix TEXT,
-                    type TEXT,
-                    quartier TEXT,
-                    surface TEXT,
-                    chambres INTEGER,
-                    date_publication DATE,
-                    date_recuperation DATETIME,
-                    source TEXT,
-                    url TEXT UNIQUE,
-                    contact_nom TEXT,
-                    contact_telephone TEXT,
-                    contact_email TEXT,
-                    contact_whatsapp TEXT
-                )
-            ''')
-            
-            # Migrer les données de l'ancienne table si elle existait
-            if table_exists:
-                cursor.execute('''
-                    INSERT INTO annonces (
-                        id, titre, description, prix, type, quartier, 
-                        surface, chambres, date_publication, date_recuperation, 
-                        source, url
-                    )
-                    SELECT id, titre, description, prix, type, quartier, 
-                           surface, chambres, date_publication, date_recuperation, 
-                           source, url
-                    FROM annonces_old
-                ''')
-                cursor.execute('DROP TABLE annonces_old')
-        
-        conn.commit()
-        print(f"✅ Base de données initialisée : {db_path}")
+        # Import tardif : migrations dépend de ce module
+        from migrations import migrer
+        appliquees = migrer(db_path)
+        if appliquees:
+            # Le snapshot de lecture a l'ancien schéma : relire la base principale jusqu'au prochain
+            from snapshot import invalider_snapshot
+            invalider_snapshot()
+            print(f"✅ Base de données initialisée : {db_path} ({appliquees} migration(s) appliquée(s))")
         return True
     except Exception as e:
         print(f"❌ Erreur initialisation base de données : {e}")
         return False
-    finally:
-        if 'conn' in locals():
-            conn.close()
 
 def save_annonce(annonce):
     """Sauvegarder une annonce dans la base de données"""
+    return save_annonces([annonce]) > 0
+
+def save_annonces(annonces):
+    """Sauvegarder un lot d'annonces en une seule transaction
+
+    Une annonce en erreur est journalisée et ignorée sans annuler le lot.
+    Les annonces réellement insérées sont publiées sur le hub de diffusion
+    une fois le lot validé. Retourne le nombre d'annonces insérées.
+    """
+    nouvelles = []
     try:
         conn = get_db_connection()
         cursor = conn.cursor()
         
-        cursor.execute('''
-            INSERT OR IGNORE INTO annonces (
-                id, titre, description, prix, type, quartier, 
-                surface, chambres, date_publication, date_recuperation, 
-                source, url, contact_nom, contact_telephone, 
-                contact_email, contact_whatsapp
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            annonce.get('id'),
-            annonce.get('titre'),
-            annonce.get('description'),
-            annonce.get('prix'),
-            annonce.get('type'),
-            annonce.get('quartier'),
-            annonce.get('surface'),
-            annonce.get('chambres'),
-            annonce.get('date_publication'),
-            datetime.now().isoformat(),
-            annonce.get('source'),
-            annonce.get('url'),
-            annonce.get('contact_nom'),
-            annonce.get('contact_telephone'),
-            annonce.get('contact_email'),
-            annonce.get('contact_whatsapp')
-        ))
+        # Import tardif : alertes dépend de ce module
+        from alertes import ecrire_alertes, rafraichir_recherches
+        
+        # Verrou d'écriture dès le début pour que les séquences soient contiguës
+        cursor.execute('BEGIN IMMEDIATE')
+        cursor.execute('SELECT COALESCE(MAX(ingest_seq), 0) FROM annonces')
+        seq = cursor.fetchone()[0]
+        rafraichir_recherches(cursor)
+        
+        for annonce in annonces:
+            # Point de sauvegarde par annonce : une annonce invalide est écartée, pas le lot
+            cursor.execute('SAVEPOINT annonce')
+            try:
+                nouvelle = inserer_annonce(cursor, annonce, seq + 1)
+                if nouvelle:
+                    # Alertes dans la même transaction : pas de perte entre le commit et l'outbox
+                    ecrire_alertes(cursor, nouvelle)
+                cursor.execute('RELEASE annonce')
+            except Exception as e:
+                cursor.execute('ROLLBACK TO annonce')
+                cursor.execute('RELEASE annonce')
+                print(f"Annonce ignorée ({annonce.get('url')}): {e}")
+                continue
+            if nouvelle:
+                seq += 1
+                nouvelles.append(nouvelle)
         
         conn.commit()
-        return cursor.rowcount > 0
     except Exception as e:
-        print(f"Erreur sauvegarde annonce: {e}")
-        return False
+        print(f"Erreur sauvegarde annonces: {e}")
+        return 0
     finally:
         if 'conn' in locals():
             conn.close()
+    
+    if nouvelles:
+        apres_ingestion(nouvelles)
+    return len(nouvelles)
+
+def inserer_annonce(cursor, annonce, seq):
+    """Insérer une annonce avec la séquence ``seq`` dans la transaction courante
 
-def get_annonces_du_jour():
-    """Récupérer les annonces du jour"""
+    Retourne l'annonce insérée (avec son fragment JSON), None si elle existe déjà.
+    """
+    annonce = dict(annonce)
+    # L'unicité de url ne couvre que la table chaude : écarter les annonces archivées
+    if annonce.get('url'):
+        cursor.execute('SELECT 1 FROM urls_archivees WHERE url = ?', (annonce['url'],))
+        if cursor.fetchone():
+            return None
+    # Numéros en E.164 : clé unique des contacts
+    for champ in ('contact_telephone', 'contact_whatsapp'):
+        if annonce.get(champ):
+            annonce[champ] = normaliser_telephone(annonce[champ]) or annonce[champ]
+    nouvelle = {colonne: annonce.get(colonne) for colonne in COLONNES_ANNONCE}
+    nouvelle['date_recuperation'] = datetime.now().isoformat()
+    nouvelle['ingest_seq'] = seq
+    payload = serialiser_annonce(nouvelle)
+    prix_num = parse_prix(annonce.get('prix'))
+
+    cursor.execute('''
+        INSERT OR IGNORE INTO annonces (
+            id, titre, description, prix, type, quartier, 
+            surface, chambres, date_publication, date_recuperation, 
+            source, url, contact_nom, contact_telephone, 
+            contact_email, contact_whatsapp, ingest_seq,
+            prix_num, surface_num, payload_json, payload_version
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', (
+        annonce.get('id'),
+        annonce.get('titre'),
+        annonce.get('description'),
+        annonce.get('prix'),
+        annonce.get('type'),
+        annonce.get('quartier'),
+        annonce.get('surface'),
+        annonce.get('chambres'),
+        annonce.get('date_publication'),
+        nouvelle['date_recuperation'],
+        annonce.get('source'),
+        annonce.get('url'),
+        annonce.get('contact_nom'),
+        annonce.get('contact_telephone'),
+        annonce.get('contact_email'),
+        annonce.get('contact_whatsapp'),
+        seq,
+        prix_num,
+        parse_surface(annonce.get('surface')),
+        payload,
+        PAYLOAD_VERSION
+    ))
+    if cursor.rowcount == 0:
+        return None
+    nouvelle['payload_json'] = payload
+    if normaliser_telephone(nouvelle['contact_telephone']):
+        enregistrer_contact(cursor, nouvelle)
+    enregistrer_quartier(cursor, nouvelle, prix_num)
+    return nouvelle
+
+def enregistrer_contact(cursor, annonce):
+    """Créer ou mettre à jour le contact (numéro E.164) d'une annonce insérée"""
+    cursor.execute('''
+        INSERT INTO contacts (telephone, nom, email, nb_annonces, premiere_annonce, derniere_annonce)
+        VALUES (?, ?, ?, 1, ?, ?)
+        ON CONFLICT(telephone) DO UPDATE SET
+            nom = COALESCE(excluded.nom, nom),
+            email = COALESCE(excluded.email, email),
+            nb_annonces = nb_annonces + 1,
+            derniere_annonce = excluded.derniere_annonce
+    ''', (
+        annonce['contact_telephone'],
+        annonce.get('contact_nom') or None,
+        annonce.get('contact_email') or None,
+        annonce['date_recuperation'],
+        annonce['date_recuperation']
+    ))
+
+def enregistrer_quartier(cursor, annonce, prix_num):
+    """Mettre à jour le catalogue des quartiers avec une annonce insérée"""
+    cursor.execute(UPSERT_CATALOGUE_QUARTIERS, (
+        annonce.get('quartier') or '',
+        annonce.get('type') or '',
+        1,
+        prix_num,
+        prix_num,
+        annonce.get('date_publication'),
+        1
+    ))
+
+def apres_ingestion(nouvelles):
+    """Traitements déclenchés après la validation d'un lot d'annonces
+
+    Le snapshot de lecture est republié (agrégats compris) avant la diffusion
+    SSE : un client notifié retrouve les nouvelles annonces sur le tier web.
+    """
+    # Imports tardifs : ces modules dépendent de celui-ci
+    from analytics import materialiser_jours
+    from snapshot import publier_snapshot
+    
+    materialiser_jours({annonce.get('date_publication') for annonce in nouvelles})
+    publier_snapshot()
+    publier_nouvelles_annonces(nouvelles)
+
+def publier_nouvelles_annonces(nouvelles):
+    """Pousser les nouvelles annonces et les statistiques aux clients SSE"""
+    if not hub.a_des_abonnes():
+        return
     try:
-        conn = get_db_connection()
+        # Réutiliser les fragments JSON déjà sérialisés
+        hub.publier('annonces', '[' + ','.join(a['payload_json'] for a in nouvelles) + ']')
+        hub.publier('statistiques', get_statistiques(base_principale=True))
+    except Exception as e:
+        print(f"Erreur diffusion annonces: {e}")
+
+def filtres_sql(quartier='', type_annonce='', depuis=None, jusqu_a=None):
+    """Conditions SQL des filtres quartier/type (recherche partielle, insensible à la casse)
+    et de la plage de dates de publication (bornes incluses)"""
+    conditions = []
+    params = []
+    if quartier:
+        conditions.append('instr(lower(quartier), ?) > 0')
+        params.append(quartier.lower())
+    if type_annonce:
+        conditions.append('instr(lower(type), ?) > 0')
+        params.append(type_annonce.lower())
+    if depuis:
+        conditions.append('date_publication >= ?')
+        params.append(depuis)
+    if jusqu_a:
+        conditions.append('date_publication <= ?')
+        params.append(jusqu_a)
+    return conditions, params
+
+def get_db_connection_plage(depuis=None, jusqu_a=None, archive=False):
+    """Connexion pour une plage de dates : l'archive n'est attachée (et lue)
+    que si la plage remonte avant la limite d'archivage, ou si ``archive``
+    demande tout l'historique
+
+    Retourne ``(conn, source)`` où ``source`` est la clause FROM à utiliser.
+    """
+    from archivage import archive_disponible, attacher_archive, plage_requiert_archive, source_annonces
+    conn = get_db_connection_lecture()
+    avec_archive = plage_requiert_archive(depuis, jusqu_a) or (archive and archive_disponible())
+    if avec_archive:
+        attacher_archive(conn)
+    return conn, source_annonces(conn.cursor(), avec_archive)
+
+def get_payloads(quartier='', type_annonce='', date_publication=None, depuis=None, jusqu_a=None,
+                 telephone=None, archive=False):
+    """Récupérer les fragments JSON pré-sérialisés des annonces filtrées
+
+    Les fragments absents ou d'une version antérieure (avant backfill) sont
+    sérialisés à la volée. ``telephone`` (E.164) utilise l'index des contacts ;
+    ``archive`` inclut les annonces archivées quelle que soit la plage.
+    """
+    conditions, params = filtres_sql(quartier, type_annonce, depuis, jusqu_a)
+    if date_publication:
+        conditions.append('date_publication = ?')
+        params.append(date_publication)
+    if telephone:
+        conditions.append('contact_telephone = ?')
+        params.append(telephone)
+    
+    try:
+        conn, source = get_db_connection_plage(depuis, jusqu_a, archive)
+        query = f'SELECT id, payload_json, payload_version FROM {source}'
+        if conditions:
+            query += ' WHERE ' + ' AND '.join(conditions)
+        query += ' ORDER BY date_recuperation DESC'
+        
         cursor = conn.cursor()
+        cursor.execute(query, params)
+        rows = cursor.fetchall()
         
-        today = datetime.now().strftime('%Y-%m-%d')
-        cursor.execute('''
-            SELECT * FROM annonces 
-            WHERE date_publication = ? 
-            ORDER BY date_recuperation DESC
-        ''', (today,))
+        manquants = [row[0] for row in rows if row[2] != PAYLOAD_VERSION or row[1] is None]
+        serialises = {}
+        if manquants:
+            placeholders = ','.join('?' * len(manquants))
+            cursor.execute(f'SELECT {SELECT_API} FROM {source} WHERE id IN ({placeholders})', manquants)
+            for row in cursor.fetchall():
+                serialises[row['id']] = serialiser_annonce(dict(row))
         
-        rows = cursor.fetchall()
-        annonces = []
-        for row in rows:
-            annonce = dict(row)
-            # Ajouter une image par défaut si pas d'image
-            annonce['image'] = 'https://via.placeholder.com/300x200?text=Immobilier'
-            annonces.append(annonce)
+        return [serialises[row[0]] if row[0] in serialises else row[1] for row in rows]
+    except Exception as e:
+        print(f"Erreur récupération annonces pré-sérialisées: {e}")
+        return []
+    finally:
+        if 'conn' in locals():
+            conn.close()
+
+def iter_annonces(quartier='', type_annonce='', since=None, batch_size=500, depuis=None, jusqu_a=None):
+    """Parcourir les annonces par lots, sans charger toute la table en mémoire
+
+    Génère des listes d'au plus ``batch_size`` annonces, lues avec ``fetchmany``
+    sur un curseur ouvert pendant toute l'itération.
+    """
+    conditions, params = filtres_sql(quartier, type_annonce, depuis, jusqu_a)
+    if since:
+        conditions.append('date_recuperation > ?')
+        params.append(since)
+
+    conn, source = get_db_connection_plage(depuis, jusqu_a)
+    query = f'SELECT {SELECT_API} FROM {source}'
+    if conditions:
+        query += ' WHERE ' + ' AND '.join(conditions)
+    query += ' ORDER BY date_recuperation DESC'
+
+    try:
+        cursor = conn.cursor()
+        cursor.execute(query, params)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield [dict(row) for row in rows]
+    finally:
+        conn.close()
+
+def get_annonces_champs(champs, quartier='', type_annonce='', date_publication=None, tronquer_description=False,
+                        depuis=None, jusqu_a=None):
+    """Récupérer les annonces filtrées en ne lisant que les colonnes demandées
+
+    ``champs`` est une liste de colonnes de COLONNES_API ; la description
+    peut être tronquée directement en SQL pour les listes.
+    """
+    selection = []
+    for champ in champs:
+        if champ == 'description' and tronquer_description:
+            selection.append(
+                f"CASE WHEN length(description) > {LONGUEUR_DESCRIPTION_RESUME} "
+                f"THEN substr(description, 1, {LONGUEUR_DESCRIPTION_RESUME}) || '…' "
+                "ELSE description END AS description"
+            )
+        else:
+            selection.append(champ)
+    
+    conditions, params = filtres_sql(quartier, type_annonce, depuis, jusqu_a)
+    if date_publication:
+        conditions.append('date_publication = ?')
+        params.append(date_publication)
+    
+    try:
+        conn, source = get_db_connection_plage(depuis, jusqu_a)
+        query = f"SELECT {', '.join(selection)} FROM {source}"
+        if conditions:
+            query += ' WHERE ' + ' AND '.join(conditions)
+        query += ' ORDER BY date_recuperation DESC'
         
-        return annonces
+        cursor = conn.cursor()
+        cursor.execute(query, params)
+        return [dict(row) for row in cursor.fetchall()]
     except Exception as e:
-        print(f"Erreur récupération annonces du jour: {e}")
+        print(f"Erreur récupération annonces (champs {champs}): {e}")
         return []
     finally:
         if 'conn' in locals():
             conn.close()
 
-def get_all_annonces():
-    """Récupérer toutes les annonces"""
+def get_annonce(annonce_id):
+    """Récupérer le détail complet d'une annonce (None si introuvable)"""
+    annonces = get_annonces_par_ids([annonce_id])
+    return annonces[0] if annonces else None
+
+def get_annonces_par_ids(ids):
+    """Récupérer des annonces par identifiant, dans l'ordre demandé"""
+    if not ids:
+        return []
     try:
-        conn = get_db_connection()
+        conn = get_db_connection_lecture()
         cursor = conn.cursor()
         
-        cursor.execute('''
-            SELECT * FROM annonces 
-            ORDER BY date_recuperation DESC
-        ''')
+        placeholders = ','.join('?' * len(ids))
+        cursor.execute(f'SELECT {SELECT_API} FROM annonces WHERE id IN ({placeholders})', list(ids))
         
-        rows = cursor.fetchall()
-        annonces = []
-        for row in rows:
+        par_id = {}
+        for row in cursor.fetchall():
             annonce = dict(row)
-            # Ajouter une image par défaut si pas d'image
-            annonce['image'] = 'https://via.placeholder.com/300x200?text=Immobilier'
-            annonces.append(annonce)
+            par_id[annonce['id']] = annonce
+        
+        # Les identifiants absents de la table chaude peuvent avoir été archivés
+        absents = [i for i in ids if i not in par_id]
+        if absents:
+            from archivage import attacher_archive, get_archive_path
+            if os.path.exists(get_archive_path()):
+                attacher_archive(conn)
+                placeholders = ','.join('?' * len(absents))
+                cursor.execute(f'SELECT {SELECT_API} FROM archive.annonces WHERE id IN ({placeholders})', absents)
+                for row in cursor.fetchall():
+                    annonce = dict(row)
+                    par_id[annonce['id']] = annonce
         
-        return annonces
+        return [par_id[i] for i in ids if i in par_id]
     except Exception as e:
-        print(f"Erreur récupération toutes annonces: {e}")
+        print(f"Erreur récupération annonces par id: {e}")
         return []
     finally:
         if 'conn' in locals():
             conn.close()
 
-def get_statistiques():
-    """Récupérer les statistiques des annonces"""
+def get_ingest_cursor():
+    """Récupérer le curseur courant du flux des changements"""
     try:
-        conn = get_db_connection()
+        conn = get_db_connection_lecture()
+        cursor = conn.cursor()
+        cursor.execute('SELECT COALESCE(MAX(ingest_seq), 0) FROM annonces')
+        return cursor.fetchone()[0]
+    except Exception as e:
+        print(f"Erreur récupération curseur: {e}")
+        return 0
+    finally:
+        if 'conn' in locals():
+            conn.close()
+
+def get_annonces_changes(since=0, limit=500):
+    """Récupérer les annonces insérées après le curseur ``since``
+
+    Retourne ``(annonces, curseur)`` où ``curseur`` est la séquence
+    d'ingestion de la dernière annonce renvoyée.
+    """
+    try:
+        conn = get_db_connection_lecture()
+        cursor = conn.cursor()
+        
+        cursor.execute(f'''
+            SELECT {SELECT_API} FROM annonces 
+            WHERE ingest_seq > ? 
+            ORDER BY ingest_seq 
+            LIMIT ?
+        ''', (since, limit))
+        
+        annonces = [dict(row) for row in cursor.fetchall()]
+        
+        curseur = annonces[-1]['ingest_seq'] if annonces else since
+        return annonces, curseur
+    except Exception as e:
+        print(f"Erreur récupération changements: {e}")
+        return [], since
+    finally:
+        if 'conn' in locals():
+            conn.close()
+
+def get_contact(telephone):
+    """Récupérer un contact par numéro E.164 (None si inconnu)"""
+    try:
+        conn = get_db_connection_lecture()
+        cursor = conn.cursor()
+        cursor.execute('SELECT * FROM contacts WHERE telephone = ?', (telephone,))
+        row = cursor.fetchone()
+        return dict(row) if row else None
+    except Exception as e:
+        print(f"Erreur récupération contact: {e}")
+        return None
+    finally:
+        if 'conn' in locals():
+            conn.close()
+
+def get_catalogue_quartiers():
+    """Quartiers présents dans les données : compteurs, annonces du jour et fourchettes de prix par type"""
+    today = datetime.now().strftime('%Y-%m-%d')
+    try:
+        conn = get_db_connection_lecture()
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT * FROM catalogue_quartiers
+            WHERE quartier != ''
+            ORDER BY quartier, type
+        ''')
+        quartiers = {}
+        for row in cursor.fetchall():
+            quartier = quartiers.setdefault(row['quartier'], {
+                'nom': row['quartier'],
+                'valeur': row['quartier'].lower(),
+                'total': 0,
+                'aujourd_hui': 0,
+                'prix': {}
+            })
+            quartier['total'] += row['nb_annonces']
+            if row['dernier_jour'] == today:
+                quartier['aujourd_hui'] += row['nb_dernier_jour']
+            if row['type']:
+                quartier['prix'][row['type']] = {'min': row['prix_min'], 'max': row['prix_max']}
+        return list(quartiers.values())
+    except Exception as e:
+        print(f"Erreur récupération catalogue des quartiers: {e}")
+        return []
+    finally:
+        if 'conn' in locals():
+            conn.close()
+
+def get_statistiques(base_principale=False):
+    """Récupérer les statistiques des annonces
+
+    Lues sur le snapshot de lecture, sauf ``base_principale`` (juste après une ingestion).
+    """
+    try:
+        conn = get_db_connection() if base_principale else get_db_connection_lecture()
         cursor = conn.cursor()
         
         # Total des annonces
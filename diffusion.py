@@ -0,0 +1,98 @@
+import json
+import threading
+from collections import deque
+
+# Taille maximale du tampon d'événements par client
+TAILLE_TAMPON_CLIENT = 100
+
+# Intervalle entre deux heartbeats SSE (secondes)
+INTERVALLE_HEARTBEAT = 15
+
+
+class AbonnementClient:
+    """Tampon borné des événements en attente pour un client SSE"""
+
+    def __init__(self, taille=TAILLE_TAMPON_CLIENT):
+        self.evenements = deque(maxlen=taille)
+        self.condition = threading.Condition()
+        self.debordement = False
+
+    def pousser(self, evenement):
+        with self.condition:
+            if len(self.evenements) == self.evenements.maxlen:
+                # Le client est trop lent : on perd les plus anciens
+                self.debordement = True
+            self.evenements.append(evenement)
+            self.condition.notify()
+
+    def attendre(self, timeout):
+        """Retourne les événements en attente (liste vide si timeout)"""
+        with self.condition:
+            if not self.evenements:
+                self.condition.wait(timeout)
+            evenements = list(self.evenements)
+            self.evenements.clear()
+            debordement = self.debordement
+            self.debordement = False
+        if debordement:
+            # Prévenir le client qu'il doit se resynchroniser via /api/annonces/changes
+            evenements.insert(0, ('resync', {}))
+        return evenements
+
+
+class DiffusionHub:
+    """Hub de diffusion en mémoire alimenté par l'ingestion des annonces"""
+
+    def __init__(self):
+        self._clients = set()
+        self._lock = threading.Lock()
+
+    def abonner(self):
+        client = AbonnementClient()
+        with self._lock:
+            self._clients.add(client)
+        return client
+
+    def desabonner(self, client):
+        with self._lock:
+            self._clients.discard(client)
+
+    def a_des_abonnes(self):
+        return bool(self._clients)
+
+    def publier(self, nom, donnees):
+        """Publier un événement vers tous les clients abonnés"""
+        # Sérialiser une seule fois pour tous les clients
+        if not isinstance(donnees, str):
+            donnees = json.dumps(donnees, ensure_ascii=False)
+        evenement = (nom, donnees)
+        with self._lock:
+            clients = list(self._clients)
+        for client in clients:
+            client.pousser(evenement)
+
+    def flux_sse(self, heartbeat=INTERVALLE_HEARTBEAT):
+        """Générateur de messages SSE : abonnement au premier message, désabonnement à la fermeture
+
+        L'abonnement est pris dans le générateur : un générateur fermé avant
+        d'avoir démarré (client déconnecté tout de suite) n'exécute jamais son
+        ``finally`` et laisserait l'abonné dans le hub.
+        """
+        client = self.abonner()
+        try:
+            yield f"retry: {heartbeat * 1000}\n\n"
+            while True:
+                evenements = client.attendre(heartbeat)
+                if not evenements:
+                    yield ": heartbeat\n\n"
+                    continue
+                for nom, donnees in evenements:
+                    if not isinstance(donnees, str):
+                        donnees = json.dumps(donnees)
+                    yield f"event: {nom}\ndata: {donnees}\n\n"
+        finally:
+            self.desabonner(client)
+
+
+# Hub partagé par le processus (ingestion et serveur web)
+hub = DiffusionHub()
@@ -3,7 +3,7 @@ from bs4 import BeautifulSoup
 from datetime import datetime, timedelta
 import time
 import json
-from database import init_database, save_annonce
+from database import init_database, save_annonces
 import random
 
 # Initialiser la base de données
@@ -279,25 +279,15 @@ def fetch_daily_ads():
     """Fonction principale pour récupérer les annonces du jour"""
     print(f"🔄 Récupération des annonces du {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     
-    all_annonces = []
-    
-    # Récupérer les annonces de différentes sources
-    print("📱 Scraping Tonkro.ci...")
-    all_annonces.extend(scrape_tonkro())
-    
-    print("🛒 Scraping Jumia Deal CI...")
-    all_annonces.extend(scrape_jumia_deal())
-    
-    print("🌍 Scraping Afribaba CI...")
-    all_annonces.extend(scrape_afribaba())
+    # Les générateurs ci-dessus sont enregistrés comme source locale « demo »
+    from sources import afficher_debit, collecter
+    all_annonces, statistiques = collecter(['demo'])
     
     # Sauvegarder les annonces
-    saved_count = 0
-    for annonce in all_annonces:
-        if save_annonce(annonce):
-            saved_count += 1
+    saved_count = save_annonces(all_annonces)
     
     print(f"✅ {saved_count}/{len(all_annonces)} annonces sauvegardées")
+    afficher_debit(statistiques)
     return all_annonces
 
 def main():
@@ -0,0 +1,217 @@
+import json
+import os
+import sys
+import threading
+from datetime import date, timedelta
+from database import (CHAMPS_RESUME, LONGUEUR_DESCRIPTION_RESUME, PAYLOAD_VERSION, SELECT_API,
+                      get_db_connection_lecture, serialiser_annonce)
+from snapshot import version_snapshot
+
+# Nombre de jours de publication gardés en mémoire (aujourd'hui inclus)
+JOURS_INDEX = int(os.getenv('INDEX_JOURS', 7))
+
+
+class EntreeIndex:
+    """Fragments JSON d'une annonce indexée (UTF-8) : détail complet et résumé des listes
+
+    En octets plutôt qu'en str : un seul caractère non ASCII (accent, « … »)
+    ferait passer toute la chaîne à 2 octets par caractère.
+    """
+    __slots__ = ('payload', 'resume')
+
+    def __init__(self, payload, resume):
+        self.payload = payload
+        self.resume = resume
+
+
+def resume_json(annonce):
+    """Fragment JSON de format=resume, identique à la projection SQL de get_annonces_champs"""
+    resume = {champ: annonce.get(champ) for champ in CHAMPS_RESUME}
+    description = resume.get('description')
+    if description and len(description) > LONGUEUR_DESCRIPTION_RESUME:
+        resume['description'] = description[:LONGUEUR_DESCRIPTION_RESUME] + '…'
+    return json.dumps(resume, ensure_ascii=False, separators=(',', ':'))
+
+
+def _bitset(positions, debut, fin):
+    """Entier dont les bits ``positions`` (comprises entre debut et fin) sont à 1"""
+    octets = bytearray((fin - debut) // 8 + 1)
+    for position in positions:
+        decalage = position - debut
+        octets[decalage >> 3] |= 1 << (decalage & 7)
+    return int.from_bytes(octets, 'little') << debut
+
+
+class IndexAnnoncesJour:
+    """Index compact en mémoire des annonces récentes
+
+    Fragments JSON par position, quartier/type stockés en codes vers des
+    chaînes internées, et un bitset (entier Python) par quartier, type et
+    jour de publication. Les positions suivent l'ordre d'ingestion : les bits
+    les plus hauts sont les annonces les plus récentes.
+    """
+
+    def __init__(self):
+        self.vider(None)
+
+    def vider(self, debut):
+        self.debut = debut
+        # Curseur d'ingestion chargé et identité du snapshot correspondant
+        self.seq = 0
+        self.version_snapshot = None
+        self.entrees = []
+        # id -> (position, jour) de la dernière version indexée de chaque annonce
+        self.positions = {}
+        self.valeurs = {'quartier': [], 'type': []}
+        self.codes = {'quartier': {}, 'type': {}}
+        self.bitsets_quartier = []
+        self.bitsets_type = []
+        self.bitsets_jour = {}
+
+    def _code(self, champ, valeur):
+        codes = self.codes[champ]
+        code = codes.get(valeur)
+        if code is None:
+            code = codes[valeur] = len(self.valeurs[champ])
+            self.valeurs[champ].append(sys.intern(valeur) if isinstance(valeur, str) else valeur)
+            if champ == 'quartier':
+                self.bitsets_quartier.append(0)
+            elif champ == 'type':
+                self.bitsets_type.append(0)
+        return code
+
+    def ajouter(self, annonces):
+        """Ajouter des annonces (dicts des colonnes de l'API + payload_json), dans l'ordre d'ingestion"""
+        if not annonces:
+            return
+        debut = len(self.entrees)
+        par_quartier, par_type, par_jour = {}, {}, {}
+        position = debut
+        for annonce in annonces:
+            try:
+                jour = date.fromisoformat(str(annonce['date_publication'])[:10]).toordinal()
+            except ValueError:
+                continue
+            ancienne = self.positions.get(annonce['id'])
+            if ancienne is not None:
+                # Annonce réécrite (nouvelle séquence d'ingestion) : retirer l'ancienne version
+                self.bitsets_jour[ancienne[1]] &= ~(1 << ancienne[0])
+            self.positions[annonce['id']] = (position, jour)
+            quartier = self._code('quartier', annonce.get('quartier'))
+            type_annonce = self._code('type', annonce.get('type'))
+            self.entrees.append(EntreeIndex(annonce['payload_json'].encode(), resume_json(annonce).encode()))
+            par_quartier.setdefault(quartier, []).append(position)
+            par_type.setdefault(type_annonce, []).append(position)
+            par_jour.setdefault(jour, []).append(position)
+            position += 1
+
+        if position == debut:
+            return
+        # Un seul OR par bitset et par lot (pas un par annonce)
+        fin = len(self.entrees) - 1
+        for code, positions in par_quartier.items():
+            self.bitsets_quartier[code] |= _bitset(positions, debut, fin)
+        for code, positions in par_type.items():
+            self.bitsets_type[code] |= _bitset(positions, debut, fin)
+        for jour, positions in par_jour.items():
+            self.bitsets_jour[jour] = self.bitsets_jour.get(jour, 0) | _bitset(positions, debut, fin)
+
+    def _masque_valeurs(self, champ, bitsets, recherche):
+        """Union des bitsets des valeurs contenant ``recherche`` (même règle que filtres_sql)"""
+        masque = 0
+        for code, valeur in enumerate(self.valeurs[champ]):
+            if valeur and recherche in valeur.lower():
+                masque |= bitsets[code]
+        return masque
+
+    def filtrer(self, jour, quartier='', type_annonce=''):
+        """Positions des annonces du jour filtrées, de la plus récente à la plus ancienne"""
+        masque = self.bitsets_jour.get(jour.toordinal(), 0)
+        if quartier and masque:
+            masque &= self._masque_valeurs('quartier', self.bitsets_quartier, quartier.lower())
+        if type_annonce and masque:
+            masque &= self._masque_valeurs('type', self.bitsets_type, type_annonce.lower())
+        positions = []
+        while masque:
+            position = masque.bit_length() - 1
+            positions.append(position)
+            masque ^= 1 << position
+        return positions
+
+
+_index = IndexAnnoncesJour()
+_index_lock = threading.Lock()
+
+
+def _charger(depuis_seq, debut):
+    """Lire les annonces récentes ingérées après ``depuis_seq``
+
+    Retourne ``(annonces, curseur)``, le curseur d'ingestion étant lu sur la même connexion.
+    """
+    try:
+        conn = get_db_connection_lecture()
+        cursor = conn.cursor()
+        cursor.execute('SELECT COALESCE(MAX(ingest_seq), 0) FROM annonces')
+        curseur = cursor.fetchone()[0]
+        cursor.execute(f'''
+            SELECT {SELECT_API}, payload_json, payload_version FROM annonces
+            WHERE ingest_seq > ? AND date_publication >= ?
+            ORDER BY ingest_seq
+        ''', (depuis_seq, debut))
+        annonces = []
+        for row in cursor.fetchall():
+            annonce = dict(row)
+            if annonce['payload_version'] != PAYLOAD_VERSION or annonce['payload_json'] is None:
+                annonce['payload_json'] = serialiser_annonce(annonce)
+            annonces.append(annonce)
+        return annonces, curseur
+    finally:
+        if 'conn' in locals():
+            conn.close()
+
+
+def rafraichir_index_jour():
+    """Mettre l'index à jour si le snapshot de lecture a été republié
+
+    L'identité du fichier snapshot (stat) sert de version du jeu de données :
+    tant qu'elle ne change pas, aucune requête SQL n'est faite. Sans snapshot
+    publié (lecture sur la base principale), la base est relue à chaque appel.
+    Les nouvelles annonces sont ajoutées incrémentalement ; l'index est
+    reconstruit quand la fenêtre de jours glisse ou si le curseur recule.
+    """
+    version = version_snapshot()
+    debut = (date.today() - timedelta(days=JOURS_INDEX - 1)).isoformat()
+    with _index_lock:
+        if _index.debut == debut and version is not None and version == _index.version_snapshot:
+            return
+        if _index.debut != debut:
+            _index.vider(debut)
+        try:
+            annonces, curseur = _charger(_index.seq, debut)
+            if curseur < _index.seq:
+                # Jeu de données remplacé (snapshot supprimé, base restaurée...)
+                _index.vider(debut)
+                annonces, curseur = _charger(0, debut)
+            _index.ajouter(annonces)
+            # Sans snapshot, des annonces plus récentes que le curseur lu ont pu être chargées
+            _index.seq = max([curseur] + [annonce['ingest_seq'] for annonce in annonces[-1:]])
+            _index.version_snapshot = version
+        except Exception as e:
+            print(f"Erreur rafraîchissement index des annonces du jour: {e}")
+            _index.vider(debut)
+
+
+def rechercher_du_jour(quartier='', type_annonce='', resume=False):
+    """Fragments JSON (octets UTF-8) des annonces du jour filtrées
+
+    Aucune requête SQL tant que le snapshot n'a pas été republié.
+    Retourne ``(payloads, curseur)``.
+    """
+    rafraichir_index_jour()
+    with _index_lock:
+        positions = _index.filtrer(date.today(), quartier, type_annonce)
+        if resume:
+            payloads = [_index.entrees[position].resume for position in positions]
+        else:
+            payloads = [_index.entrees[position].payload for position in positions]
+        return payloads, _index.seq
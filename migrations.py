@@ -0,0 +1,496 @@
+import sqlite3
+import threading
+import time
+from datetime import date
+from database import (COLONNES_API, PAYLOAD_VERSION, UPSERT_CATALOGUE_QUARTIERS, normaliser_telephone,
+                      parse_prix, parse_surface, serialiser_annonce)
+
+# Nombre de lignes traitées par transaction lors des backfills
+TAILLE_LOT_BACKFILL = 1000
+
+# Pause entre deux lots pour laisser passer les autres écrivains
+PAUSE_ENTRE_LOTS = 0.05
+
+
+def _colonnes(cursor, table):
+    cursor.execute(f'PRAGMA table_info({table})')
+    return {column[1] for column in cursor.fetchall()}
+
+
+def _ajouter_colonnes(cursor, table, colonnes):
+    """ALTER TABLE ADD COLUMN en place pour les colonnes manquantes (sans recopie)"""
+    existantes = _colonnes(cursor, table)
+    for nom, type_sql in colonnes:
+        if nom not in existantes:
+            cursor.execute(f'ALTER TABLE {table} ADD COLUMN {nom} {type_sql}')
+
+
+def _planifier_backfill(cursor, nom, depart=0):
+    cursor.execute('INSERT OR IGNORE INTO migrations_backfill (nom, dernier_rowid) VALUES (?, ?)', (nom, depart))
+
+
+def _replanifier_backfill(cursor, nom):
+    """Relancer depuis le début un backfill déjà exécuté (règle de calcul modifiée)"""
+    cursor.execute('INSERT OR REPLACE INTO migrations_backfill (nom, dernier_rowid, termine) VALUES (?, 0, 0)', (nom,))
+
+
+def _planifier_backfill_descendant(cursor, nom):
+    """Backfill parcourant les lignes existantes par rowid décroissant
+
+    Les annonces insérées après la migration (rowid plus grand) sont déjà
+    comptées à l'ingestion : le parcours part de la borne actuelle.
+    """
+    cursor.execute('SELECT COALESCE(MAX(rowid), 0) + 1 FROM annonces')
+    _planifier_backfill(cursor, nom, cursor.fetchone()[0])
+
+
+# --- Étapes de migration (ordonnées, idempotentes) ---
+
+def _m001_table_annonces(cursor):
+    """Table des annonces (schéma d'origine)"""
+    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name IN ('annonces', 'annonces_old')")
+    tables = {row[0] for row in cursor.fetchall()}
+    if 'annonces_old' in tables:
+        # Reste de l'ancienne migration par copie interrompue
+        if 'annonces' in tables:
+            cursor.execute('DROP TABLE annonces_old')
+        else:
+            cursor.execute('ALTER TABLE annonces_old RENAME TO annonces')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS annonces (
+            id INTEGER PRIMARY KEY,
+            titre TEXT,
+            description TEXT,
+            prix TEXT,
+            type TEXT,
+            quartier TEXT,
+            surface TEXT,
+            chambres INTEGER,
+            date_publication DATE,
+            date_recuperation DATETIME,
+            source TEXT,
+            url TEXT UNIQUE
+        )
+    ''')
+
+
+def _m002_colonnes_contact(cursor):
+    """Colonnes de contact"""
+    _ajouter_colonnes(cursor, 'annonces', [
+        ('contact_nom', 'TEXT'),
+        ('contact_telephone', 'TEXT'),
+        ('contact_email', 'TEXT'),
+        ('contact_whatsapp', 'TEXT')
+    ])
+
+
+def _m003_ingest_seq(cursor):
+    """Séquence d'ingestion monotone pour le flux des changements"""
+    _ajouter_colonnes(cursor, 'annonces', [('ingest_seq', 'INTEGER')])
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_annonces_ingest_seq ON annonces(ingest_seq)')
+    _planifier_backfill(cursor, 'ingest_seq')
+
+
+def _m004_prix_surface_num(cursor):
+    """Prix et surface numériques pour les agrégats de prix"""
+    _ajouter_colonnes(cursor, 'annonces', [('prix_num', 'INTEGER'), ('surface_num', 'REAL')])
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_annonces_date_publication ON annonces(date_publication)')
+    _planifier_backfill(cursor, 'prix_surface')
+
+
+def _m005_tables_alertes(cursor):
+    """Recherches sauvegardées et file des alertes à notifier"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS recherches_sauvegardees (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            email TEXT,
+            quartier TEXT,
+            type TEXT,
+            prix_min INTEGER,
+            prix_max INTEGER,
+            chambres_min INTEGER,
+            date_creation DATETIME
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS alertes_outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            recherche_id INTEGER,
+            annonce_id INTEGER,
+            email TEXT,
+            payload TEXT,
+            date_creation DATETIME,
+            date_envoi DATETIME
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_outbox_a_envoyer ON alertes_outbox(date_envoi, id)')
+
+
+def _m006_stats_prix_jour(cursor):
+    """Agrégats de prix matérialisés par jour, quartier et type"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS stats_prix_jour (
+            jour DATE,
+            quartier TEXT,
+            type TEXT,
+            volume INTEGER,
+            volume_prix INTEGER,
+            prix_min INTEGER,
+            prix_p25 REAL,
+            prix_median REAL,
+            prix_p75 REAL,
+            prix_p90 REAL,
+            prix_max INTEGER,
+            prix_m2_median REAL,
+            PRIMARY KEY (jour, quartier, type)
+        )
+    ''')
+    _planifier_backfill(cursor, 'stats_prix')
+
+
+def _m007_payload_json(cursor):
+    """Fragments JSON pré-sérialisés des annonces"""
+    _ajouter_colonnes(cursor, 'annonces', [('payload_json', 'TEXT'), ('payload_version', 'INTEGER')])
+    _planifier_backfill(cursor, 'payload_json')
+
+
+def _m008_contacts(cursor):
+    """Contacts par numéro E.164 et index des annonces par téléphone"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS contacts (
+            telephone TEXT PRIMARY KEY,
+            nom TEXT,
+            email TEXT,
+            nb_annonces INTEGER DEFAULT 0,
+            premiere_annonce DATETIME,
+            derniere_annonce DATETIME
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_annonces_contact_telephone ON annonces(contact_telephone)')
+    _planifier_backfill_descendant(cursor, 'contacts')
+
+
+def _m009_catalogue_quartiers(cursor):
+    """Catalogue des quartiers (compteurs et fourchettes de prix par type) maintenu à l'ingestion"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS catalogue_quartiers (
+            quartier TEXT,
+            type TEXT,
+            nb_annonces INTEGER DEFAULT 0,
+            prix_min INTEGER,
+            prix_max INTEGER,
+            dernier_jour DATE,
+            nb_dernier_jour INTEGER DEFAULT 0,
+            PRIMARY KEY (quartier, type)
+        )
+    ''')
+    _planifier_backfill_descendant(cursor, 'catalogue_quartiers')
+
+
+def _m010_urls_archivees(cursor):
+    """URLs des annonces archivées : l'unicité de url doit couvrir l'archive"""
+    cursor.execute('CREATE TABLE IF NOT EXISTS urls_archivees (url TEXT PRIMARY KEY) WITHOUT ROWID')
+
+
+def _m011_reparser_prix(cursor):
+    """Prix numériques relus avec parse_prix corrigé (premier nombre seulement), agrégats recalculés"""
+    _replanifier_backfill(cursor, 'prix_surface')
+    _replanifier_backfill(cursor, 'stats_prix')
+
+
+def _m012_payload_sans_image(cursor):
+    """Fragments JSON resérialisés sans image par défaut (PAYLOAD_VERSION 2)"""
+    _replanifier_backfill(cursor, 'payload_json')
+
+
+MIGRATIONS = [
+    (1, _m001_table_annonces),
+    (2, _m002_colonnes_contact),
+    (3, _m003_ingest_seq),
+    (4, _m004_prix_surface_num),
+    (5, _m005_tables_alertes),
+    (6, _m006_stats_prix_jour),
+    (7, _m007_payload_json),
+    (8, _m008_contacts),
+    (9, _m009_catalogue_quartiers),
+    (10, _m010_urls_archivees),
+    (11, _m011_reparser_prix),
+    (12, _m012_payload_sans_image),
+]
+
+# Version du schéma, stockée dans PRAGMA user_version
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+# --- Backfills par lots, exécutés en arrière-plan ---
+
+def _backfill_ingest_seq(cursor, dernier_rowid):
+    cursor.execute('''
+        SELECT rowid FROM annonces
+        WHERE rowid > ? AND ingest_seq IS NULL
+        ORDER BY rowid
+        LIMIT ?
+    ''', (dernier_rowid, TAILLE_LOT_BACKFILL))
+    rowids = [row[0] for row in cursor.fetchall()]
+    if not rowids:
+        return None
+    cursor.execute('SELECT COALESCE(MAX(ingest_seq), 0) FROM annonces')
+    seq = cursor.fetchone()[0]
+    cursor.executemany(
+        'UPDATE annonces SET ingest_seq = ? WHERE rowid = ?',
+        [(seq + i, rowid) for i, rowid in enumerate(rowids, start=1)]
+    )
+    return rowids[-1]
+
+
+def _backfill_prix_surface(cursor, dernier_rowid):
+    cursor.execute('''
+        SELECT rowid, prix, surface FROM annonces
+        WHERE rowid > ?
+        ORDER BY rowid
+        LIMIT ?
+    ''', (dernier_rowid, TAILLE_LOT_BACKFILL))
+    rows = cursor.fetchall()
+    if not rows:
+        return None
+    cursor.executemany(
+        'UPDATE annonces SET prix_num = ?1, surface_num = ?2 WHERE rowid = ?3 AND (prix_num IS NOT ?1 OR surface_num IS NOT ?2)',
+        [(parse_prix(prix), parse_surface(surface), rowid) for rowid, prix, surface in rows]
+    )
+    return rows[-1][0]
+
+
+def _backfill_stats_prix(cursor, dernier_jour):
+    """Un jour de publication par transaction ; progression : ordinal du dernier jour traité"""
+    # Import tardif : NumPy n'est chargé que si le backfill est nécessaire
+    from analytics import _materialiser
+    jour = date.fromordinal(dernier_jour).isoformat() if dernier_jour else None
+    while True:
+        # Sans borne au départ : les dates stockées en nombre (affinité DATE) précèdent le texte
+        if jour is None:
+            cursor.execute('SELECT MIN(date_publication) FROM annonces')
+        else:
+            cursor.execute('SELECT MIN(date_publication) FROM annonces WHERE date_publication > ?', (jour,))
+        jour = cursor.fetchone()[0]
+        if jour is None:
+            return None
+        _materialiser(cursor, [jour])
+        try:
+            ordinal = date.fromisoformat(jour).toordinal()
+        except (TypeError, ValueError):
+            continue
+        # Date non canonique (sans ordinal reproduisant le même texte) : jour suivant dans le même lot
+        if date.fromordinal(ordinal).isoformat() == jour:
+            return ordinal
+
+
+def _backfill_payload_json(cursor, dernier_rowid):
+    colonnes = ', '.join(COLONNES_API)
+    cursor.execute(f'''
+        SELECT rowid, {colonnes} FROM annonces
+        WHERE rowid > ?
+        ORDER BY rowid
+        LIMIT ?
+    ''', (dernier_rowid, TAILLE_LOT_BACKFILL))
+    rows = cursor.fetchall()
+    if not rows:
+        return None
+    cursor.executemany(
+        'UPDATE annonces SET payload_json = ?, payload_version = ? WHERE rowid = ? AND payload_version IS NOT ?',
+        [(serialiser_annonce(dict(zip(COLONNES_API, row[1:]))), PAYLOAD_VERSION, row[0], PAYLOAD_VERSION)
+         for row in rows]
+    )
+    return rows[-1][0]
+
+
+def _backfill_contacts(cursor, borne):
+    """Normaliser un lot de numéros (rowid inférieur à ``borne``) et fusionner ses contacts"""
+    colonnes = ', '.join(COLONNES_API)
+    cursor.execute(f'''
+        SELECT rowid, {colonnes} FROM annonces
+        WHERE rowid < ?
+        ORDER BY rowid DESC
+        LIMIT ?
+    ''', (borne, TAILLE_LOT_BACKFILL))
+    rows = cursor.fetchall()
+    if not rows:
+        return None
+    # Les annonces réécrites reçoivent une nouvelle séquence d'ingestion : flux des
+    # changements, index en mémoire et caches indexés par le curseur les relisent
+    cursor.execute('SELECT COALESCE(MAX(ingest_seq), 0) FROM annonces')
+    seq = cursor.fetchone()[0]
+    mises_a_jour = []
+    contacts = {}
+    for row in rows:
+        annonce = dict(zip(COLONNES_API, row[1:]))
+        telephone = normaliser_telephone(annonce['contact_telephone'])
+        whatsapp = normaliser_telephone(annonce['contact_whatsapp'])
+        if (telephone and telephone != annonce['contact_telephone']) or (whatsapp and whatsapp != annonce['contact_whatsapp']):
+            seq += 1
+            annonce['contact_telephone'] = telephone or annonce['contact_telephone']
+            annonce['contact_whatsapp'] = whatsapp or annonce['contact_whatsapp']
+            annonce['ingest_seq'] = seq
+            mises_a_jour.append((annonce['contact_telephone'], annonce['contact_whatsapp'], seq,
+                                 serialiser_annonce(annonce), PAYLOAD_VERSION, row[0]))
+        if telephone:
+            recuperation = annonce['date_recuperation']
+            contact = contacts.setdefault(telephone, {'nom': None, 'email': None, 'nb': 0, 'dates': []})
+            # Lot parcouru du plus récent au plus ancien : garder le nom/email le plus récent
+            contact['nom'] = contact['nom'] or annonce['contact_nom'] or None
+            contact['email'] = contact['email'] or annonce['contact_email'] or None
+            contact['nb'] += 1
+            if recuperation:
+                contact['dates'].append(recuperation)
+    cursor.executemany(
+        'UPDATE annonces SET contact_telephone = ?, contact_whatsapp = ?, ingest_seq = ?, payload_json = ?, payload_version = ? '
+        'WHERE rowid = ?',
+        mises_a_jour
+    )
+    # Annonces antérieures à celles comptées à l'ingestion : nom/email existants prioritaires
+    cursor.executemany('''
+        INSERT INTO contacts (telephone, nom, email, nb_annonces, premiere_annonce, derniere_annonce)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT(telephone) DO UPDATE SET
+            nom = COALESCE(nom, excluded.nom),
+            email = COALESCE(email, excluded.email),
+            nb_annonces = nb_annonces + excluded.nb_annonces,
+            premiere_annonce = min(COALESCE(premiere_annonce, excluded.premiere_annonce),
+                                   COALESCE(excluded.premiere_annonce, premiere_annonce)),
+            derniere_annonce = max(COALESCE(derniere_annonce, excluded.derniere_annonce),
+                                   COALESCE(excluded.derniere_annonce, derniere_annonce))
+    ''', [(telephone, c['nom'], c['email'], c['nb'], min(c['dates'], default=None), max(c['dates'], default=None))
+          for telephone, c in contacts.items()])
+    return rows[-1][0]
+
+
+def _backfill_catalogue_quartiers(cursor, borne):
+    """Fusionner dans le catalogue un lot d'annonces de rowid inférieur à ``borne``"""
+    cursor.execute('''
+        SELECT rowid FROM annonces
+        WHERE rowid < ?
+        ORDER BY rowid DESC
+        LIMIT ?
+    ''', (borne, TAILLE_LOT_BACKFILL))
+    rowids = [row[0] for row in cursor.fetchall()]
+    if not rowids:
+        return None
+    cursor.execute('''
+        WITH lot AS (
+            SELECT COALESCE(quartier, '') AS quartier, COALESCE(type, '') AS type, prix_num, date_publication
+            FROM annonces
+            WHERE rowid >= ? AND rowid < ?
+        ), groupes AS (
+            SELECT quartier, type, COUNT(*) AS nb, MIN(prix_num) AS prix_min, MAX(prix_num) AS prix_max,
+                   MAX(date_publication) AS dernier_jour
+            FROM lot
+            GROUP BY quartier, type
+        )
+        SELECT g.quartier, g.type, g.nb, g.prix_min, g.prix_max, g.dernier_jour,
+               (SELECT COUNT(*) FROM lot
+                WHERE lot.quartier = g.quartier AND lot.type = g.type AND lot.date_publication = g.dernier_jour)
+        FROM groupes g
+    ''', (rowids[-1], borne))
+    cursor.executemany(UPSERT_CATALOGUE_QUARTIERS, cursor.fetchall())
+    return rowids[-1]
+
+
+# Ordre d'exécution : les agrégats de prix dépendent de prix_num/surface_num,
+# les fragments JSON de ingest_seq ; les contacts réécrivent les fragments normalisés
+BACKFILLS = [
+    ('ingest_seq', _backfill_ingest_seq),
+    ('prix_surface', _backfill_prix_surface),
+    ('stats_prix', _backfill_stats_prix),
+    ('payload_json', _backfill_payload_json),
+    ('contacts', _backfill_contacts),
+    ('catalogue_quartiers', _backfill_catalogue_quartiers),
+]
+
+_backfill_lock = threading.Lock()
+
+
+def executer_backfills(db_path):
+    """Exécuter les backfills en attente, un lot court par transaction"""
+    if not _backfill_lock.acquire(blocking=False):
+        return  # Déjà en cours dans ce processus
+    try:
+        conn = sqlite3.connect(db_path, isolation_level=None, timeout=30)
+        cursor = conn.cursor()
+        for nom, backfill in BACKFILLS:
+            while True:
+                cursor.execute('BEGIN IMMEDIATE')
+                try:
+                    # Relire la progression sous verrou (plusieurs workers possibles)
+                    cursor.execute('SELECT dernier_rowid, termine FROM migrations_backfill WHERE nom = ?', (nom,))
+                    row = cursor.fetchone()
+                    if row is None or row[1]:
+                        cursor.execute('COMMIT')
+                        break
+                    progression = backfill(cursor, row[0])
+                    if progression is None:
+                        cursor.execute('UPDATE migrations_backfill SET termine = 1 WHERE nom = ?', (nom,))
+                    else:
+                        cursor.execute('UPDATE migrations_backfill SET dernier_rowid = ? WHERE nom = ?', (progression, nom))
+                    cursor.execute('COMMIT')
+                except Exception:
+                    cursor.execute('ROLLBACK')
+                    raise
+                if progression is None:
+                    print(f"✅ Backfill terminé : {nom}")
+                    break
+                time.sleep(PAUSE_ENTRE_LOTS)
+    except Exception as e:
+        print(f"❌ Erreur backfill : {e}")
+    finally:
+        if 'conn' in locals():
+            conn.close()
+        _backfill_lock.release()
+
+
+def migrer(db_path):
+    """Appliquer les migrations manquantes et lancer les backfills en attente
+
+    Retourne le nombre de migrations appliquées (0 si le schéma est à jour).
+    """
+    conn = sqlite3.connect(db_path, isolation_level=None, timeout=30)
+    try:
+        cursor = conn.cursor()
+        cursor.execute('PRAGMA user_version')
+        version = cursor.fetchone()[0]
+        appliquees = 0
+
+        if version < SCHEMA_VERSION:
+            # WAL : les lecteurs ne sont pas bloqués par les écritures des backfills
+            cursor.execute('PRAGMA journal_mode=WAL')
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS migrations_backfill (
+                    nom TEXT PRIMARY KEY,
+                    dernier_rowid INTEGER DEFAULT 0,
+                    termine INTEGER DEFAULT 0
+                )
+            ''')
+            for numero, etape in MIGRATIONS:
+                if numero <= version:
+                    continue
+                cursor.execute('BEGIN IMMEDIATE')
+                try:
+                    # Un autre processus a pu appliquer l'étape entre-temps
+                    cursor.execute('PRAGMA user_version')
+                    if cursor.fetchone()[0] >= numero:
+                        cursor.execute('COMMIT')
+                        continue
+                    etape(cursor)
+                    cursor.execute(f'PRAGMA user_version = {numero}')
+                    cursor.execute('COMMIT')
+                    appliquees += 1
+                except Exception:
+                    cursor.execute('ROLLBACK')
+                    raise
+
+        cursor.execute('SELECT COUNT(*) FROM migrations_backfill WHERE termine = 0')
+        backfills_en_attente = cursor.fetchone()[0]
+    finally:
+        conn.close()
+
+    if backfills_en_attente:
+        threading.Thread(target=executer_backfills, args=(db_path,), daemon=True).start()
+    return appliquees
@@ -0,0 +1,180 @@
+import random
+import threading
+import time
+from collections import deque
+from urllib.parse import urlparse
+
+import requests
+
+# Échecs consécutifs avant d'ouvrir le disjoncteur d'un hôte
+SEUIL_ECHECS = 3
+
+# Durée (secondes) pendant laquelle un hôte en panne n'est plus sollicité
+DUREE_OUVERTURE = 60
+
+# Nombre total de nouvelles tentatives autorisées par exécution (tous hôtes confondus)
+BUDGET_TENTATIVES = 20
+
+# Tentatives maximum par requête (première incluse)
+TENTATIVES_MAX = 3
+
+# Backoff exponentiel borné : base * 2^n, plafonné, avec jitter complet
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 8.0
+
+# Timeout adaptatif : multiple du p95 des latences observées, entre ces bornes
+TIMEOUT_CONNEXION = 3.05
+TIMEOUT_MIN = 2.0
+FACTEUR_TIMEOUT = 3
+ECHANTILLONS_MIN = 5
+
+# Codes HTTP considérés comme transitoires (nouvelle tentative)
+CODES_TRANSITOIRES = {429, 500, 502, 503, 504}
+
+
+class CircuitOuvert(Exception):
+    """Requête refusée : le disjoncteur de l'hôte est ouvert"""
+
+
+class EtatHote:
+    """Disjoncteur et mesures d'un hôte"""
+
+    def __init__(self):
+        self.latences = deque(maxlen=50)
+        self.echecs_consecutifs = 0
+        self.ouvert_jusqu_a = 0.0
+        self.requetes = 0
+        self.succes = 0
+        self.echecs = 0
+        self.timeouts = 0
+        self.tentatives = 0
+        self.refusees = 0
+
+    def percentile(self, p):
+        if not self.latences:
+            return None
+        triees = sorted(self.latences)
+        return triees[min(len(triees) - 1, int(len(triees) * p / 100))]
+
+    def timeout_lecture(self, plafond):
+        """Timeout de lecture adapté aux latences observées (plafond tant qu'elles manquent)"""
+        if len(self.latences) < ECHANTILLONS_MIN:
+            return plafond
+        return max(TIMEOUT_MIN, min(plafond, self.percentile(95) * FACTEUR_TIMEOUT))
+
+    def disponible(self):
+        """Fermé, ou semi-ouvert une fois la durée d'ouverture écoulée (une requête d'essai)"""
+        return time.monotonic() >= self.ouvert_jusqu_a
+
+    def enregistrer_succes(self, latence):
+        self.latences.append(latence)
+        self.succes += 1
+        self.echecs_consecutifs = 0
+        self.ouvert_jusqu_a = 0.0
+
+    def enregistrer_echec(self):
+        self.echecs += 1
+        self.echecs_consecutifs += 1
+        if self.echecs_consecutifs >= SEUIL_ECHECS:
+            self.ouvert_jusqu_a = time.monotonic() + DUREE_OUVERTURE
+
+    @property
+    def etat(self):
+        if self.disponible():
+            return 'fermé' if self.echecs_consecutifs < SEUIL_ECHECS else 'semi-ouvert'
+        return 'ouvert'
+
+
+class PolitiqueFetch:
+    """Politique de récupération autour d'une session requests
+
+    Disjoncteur par hôte, backoff exponentiel avec jitter, budget de
+    nouvelles tentatives par exécution et timeouts adaptés au p95 observé.
+    """
+
+    def __init__(self, session, budget=BUDGET_TENTATIVES):
+        self.session = session
+        self.budget = budget
+        self.hotes = {}
+        self._lock = threading.Lock()
+
+    def _etat(self, hote):
+        with self._lock:
+            return self.hotes.setdefault(hote, EtatHote())
+
+    def _consommer_budget(self):
+        with self._lock:
+            if self.budget <= 0:
+                return False
+            self.budget -= 1
+            return True
+
+    def get(self, url, timeout=15, **kwargs):
+        """GET avec la politique de l'hôte ; lève CircuitOuvert si l'hôte est en panne
+
+        ``timeout`` est le plafond du timeout de lecture. Les erreurs réseau et
+        codes transitoires sont retentés tant que le budget le permet ; la
+        dernière réponse (ou exception) est renvoyée sinon.
+        """
+        hote = urlparse(url).netloc
+        etat = self._etat(hote)
+
+        for tentative in range(TENTATIVES_MAX):
+            if not etat.disponible():
+                etat.refusees += 1
+                raise CircuitOuvert(f"{hote} indisponible (disjoncteur ouvert)")
+            if tentative:
+                etat.tentatives += 1
+                time.sleep(random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** tentative)))
+
+            etat.requetes += 1
+            debut = time.monotonic()
+            try:
+                response = self.session.get(
+                    url, timeout=(TIMEOUT_CONNEXION, etat.timeout_lecture(timeout)), **kwargs
+                )
+            except requests.RequestException as e:
+                if isinstance(e, requests.Timeout):
+                    etat.timeouts += 1
+                etat.enregistrer_echec()
+                if tentative + 1 < TENTATIVES_MAX and self._consommer_budget():
+                    continue
+                raise
+
+            if response.status_code in CODES_TRANSITOIRES:
+                etat.enregistrer_echec()
+                if tentative + 1 < TENTATIVES_MAX and self._consommer_budget():
+                    continue
+                return response
+
+            etat.enregistrer_succes(time.monotonic() - debut)
+            return response
+
+    def rapport(self):
+        """État de santé par hôte"""
+        rapport = {}
+        for hote, etat in self.hotes.items():
+            p50, p95 = etat.percentile(50), etat.percentile(95)
+            rapport[hote] = {
+                'etat': etat.etat,
+                'requetes': etat.requetes,
+                'succes': etat.succes,
+                'echecs': etat.echecs,
+                'timeouts': etat.timeouts,
+                'tentatives': etat.tentatives,
+                'refusees': etat.refusees,
+                'latence_p50': round(p50, 3) if p50 is not None else None,
+                'latence_p95': round(p95, 3) if p95 is not None else None,
+            }
+        return rapport
+
+
+def afficher_rapport_sante(rapport):
+    """Afficher un rapport de santé par hôte (PolitiqueFetch.rapport())"""
+    for hote, sante in rapport.items():
+        icone = {'fermé': '🟢', 'semi-ouvert': '🟡', 'ouvert': '🔴'}[sante['etat']]
+        latences = (f"p50 {sante['latence_p50']}s / p95 {sante['latence_p95']}s"
+                    if sante['latence_p50'] is not None else "aucune réponse")
+        print(f"   {icone} {hote} : {sante['succes']}/{sante['requetes']} OK, "
+              f"{sante['timeouts']} timeouts, {sante['tentatives']} nouvelles tentatives, "
+              f"{sante['refusees']} refusées, {latences}")
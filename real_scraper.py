@@ -3,7 +3,9 @@ from bs4 import BeautifulSoup
 import re
 from datetime import datetime
 import time
-from database import save_annonce
+from database import normaliser_telephone, save_annonces
+from politique_fetch import CircuitOuvert, PolitiqueFetch
+from sources import afficher_debit, collecter
 
 class RealEstateScraper:
     def __init__(self):
@@ -12,75 +14,13 @@ class RealEstateScraper:
         }
         self.session = requests.Session()
         self.session.headers.update(self.headers)
-
-    def scrape_all_sources(self):
-        """Scraper toutes les sources disponibles"""
-        all_annonces = []
-        
-        print("🔍 Scraping des sites d'annonces réels...")
-        
-        # Scraper différentes sources
-        all_annonces.extend(self.scrape_tonkro())
-        time.sleep(2)  # Respecter les serveurs
-        
-        all_annonces.extend(self.scrape_jumia_house())
-        time.sleep(2)
-        
-        all_annonces.extend(self.scrape_facebook_marketplace())
-        time.sleep(2)
-        
-        return all_annonces
-
-    def scrape_tonkro(self):
-        """Scraper Tonkro.ci - le vrai site"""
-        print("📱 Scraping Tonkro.ci...")
-        annonces = []
-        
-        try:
-            # URLs des différentes catégories
-            urls = [
-                "https://tonkro.ci/categorie/immobilier/vente-maison-villa",
-                "https://tonkro.ci/categorie/immobilier/location-maison-villa",
-                "https://tonkro.ci/categorie/immobilier/vente-appartement",
-                "https://tonkro.ci/categorie/immobilier/location-appartement"
-            ]
-            
-            for url in urls:
-                try:
-                    response = self.session.get(url, timeout=15)
-                    if response.status_code != 200:
-                        continue
-                        
-                    soup = BeautifulSoup(response.content, 'html.parser')
-                    
-                    # Chercher les liens vers les annonces individuelles
-                    # Ces sélecteurs peuvent changer selon la structure du site
-                    annonce_links = soup.find_all('a', href=re.compile(r'/annonce/'))
-                    
-                    for link in annonce_links[:5]:  # Limiter à 5 par catégorie
-                        annonce_url = link.get('href')
-                        if not annonce_url.startswith('http'):
-                            annonce_url = 'https://tonkro.ci' + annonce_url
-                        
-                        annonce_data = self.scrape_single_tonkro_ad(annonce_url)
-                        if annonce_data:
-                            annonces.append(annonce_data)
-                            time.sleep(1)  # Pause entre chaque annonce
-                            
-                except Exception as e:
-                    print(f"Erreur URL {url}: {e}")
-                    continue
-                    
-        except Exception as e:
-            print(f"Erreur scraping Tonkro: {e}")
-        
-        print(f"✅ {len(annonces)} annonces récupérées de Tonkro.ci")
-        return annonces
+        # Disjoncteurs, backoff, budget de tentatives et timeouts adaptatifs par hôte
+        self.fetch = PolitiqueFetch(self.session)
 
     def scrape_single_tonkro_ad(self, url):
         """Scraper une annonce individuelle de Tonkro"""
         try:
-            response = self.session.get(url, timeout=10)
+            response = self.fetch.get(url, timeout=10)
             if response.status_code != 200:
                 return None
                 
@@ -121,6 +61,8 @@ class RealEstateScraper:
                 'contact_whatsapp': contact_info.get('whatsapp', contact_info.get('telephone', ''))
             }
             
+        except CircuitOuvert:
+            raise
         except Exception as e:
             print(f"Erreur scraping annonce {url}: {e}")
             return None
@@ -143,13 +85,8 @@ class RealEstateScraper:
         for pattern in phone_patterns:
             matches = re.findall(pattern, text_content)
             if matches:
-                # Nettoyer le numéro
-                phone = re.sub(r'\s+', '', matches[0])
-                if not phone.startswith('+225'):
-                    if phone.startswith('225'):
-                        phone = '+' + phone
-                    elif len(phone) == 8:
-                        phone = '+225' + phone
+                # Normaliser le numéro en E.164 (+225 et 10 chiffres)
+                phone = normaliser_telephone(matches[0]) or re.sub(r'\s+', '', matches[0])
                 
                 contact_info['telephone'] = phone
                 contact_info['whatsapp'] = phone
@@ -171,33 +108,6 @@ class RealEstateScraper:
         
         return contact_info
 
-    def scrape_jumia_house(self):
-        """Scraper Jumia House CI"""
-        print("🏠 Scraping Jumia House...")
-        annonces = []
-        
-        try:
-            url = "https://house.jumia.ci/appartements-a-louer/abidjan"
-            response = self.session.get(url, timeout=15)
-            
-            if response.status_code == 200:
-                soup = BeautifulSoup(response.content, 'html.parser')
-                # Adapter selon la structure de Jumia House
-                # Similar logic as Tonkro
-                pass
-                
-        except Exception as e:
-            print(f"Erreur Jumia House: {e}")
-        
-        return annonces
-
-    def scrape_facebook_marketplace(self):
-        """Scraper Facebook Marketplace (plus complexe)"""
-        print("📘 Tentative Facebook Marketplace...")
-        # Facebook nécessite une approche différente (authentification, JavaScript)
-        # Pour l'instant, on skip
-        return []
-
     # Fonctions utilitaires
     def extract_text(self, soup, selectors):
         """Extraire du texte avec plusieurs sélecteurs possibles"""
@@ -275,25 +185,27 @@ class RealEstateScraper:
         return 0
 
 
-def fetch_daily_ads():
+def fetch_daily_ads(noms_sources=None):
     """Fonction principale pour récupérer les vraies annonces"""
-    scraper = RealEstateScraper()
-    
     print(f"🚀 Début du scraping des vraies annonces - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     
-    # Récupérer les annonces
-    annonces = scraper.scrape_all_sources()
+    # Récupérer les annonces des sources enregistrées, en parallèle
+    print("🔍 Scraping des sites d'annonces réels...")
+    annonces, statistiques = collecter(noms_sources)
     
     # Sauvegarder seulement les annonces avec des contacts
-    saved_count = 0
+    a_sauvegarder = []
     for annonce in annonces:
         if annonce.get('contact_telephone') or annonce.get('contact_email'):
-            if save_annonce(annonce):
-                saved_count += 1
+            a_sauvegarder.append(annonce)
         else:
             print(f"❌ Annonce ignorée (pas de contact): {annonce.get('titre', 'Sans titre')}")
     
+    # Un seul commit pour tout le lot
+    saved_count = save_annonces(a_sauvegarder)
+    
     print(f"✅ {saved_count}/{len(annonces)} vraies annonces sauvegardées")
+    afficher_debit(statistiques)
     return annonces
 
 
@@ -0,0 +1,131 @@
+import threading
+import numpy as np
+from database import get_db_connection_lecture, get_ingest_cursor
+
+# Poids des critères dans la distance entre deux annonces
+POIDS_QUARTIER = 1.0   # pénalité si les quartiers diffèrent
+POIDS_TYPE = 100.0     # une vente n'est jamais « similaire » à une location
+POIDS_PRIX = 1.0       # par unité de log(prix)
+POIDS_SURFACE = 0.5    # par unité de log(surface)
+POIDS_CHAMBRES = 0.25  # par chambre d'écart
+PENALITE_INCONNUE = 1.0
+
+
+class IndexSimilarite:
+    """Matrice de caractéristiques en mémoire pour la recherche des plus proches voisins
+
+    Le quartier et le type sont stockés sous forme de codes entiers (distance
+    équivalente à un encodage one-hot), les valeurs numériques en colonnes
+    float. Les tableaux grossissent par doublement de capacité pour permettre
+    l'ajout incrémental des annonces ingérées.
+    """
+
+    def __init__(self):
+        self.dernier_seq = 0
+        self.taille = 0
+        self.codes_quartier = {}
+        self.codes_type = {}
+        self.positions = {}
+        self._allouer(1024)
+
+    def _allouer(self, capacite):
+        def agrandir(ancien, dtype):
+            nouveau = np.full(capacite, np.nan if dtype == np.float64 else -1, dtype=dtype)
+            if ancien is not None:
+                nouveau[:self.taille] = ancien[:self.taille]
+            return nouveau
+
+        self.ids = agrandir(getattr(self, 'ids', None), np.int64)
+        self.quartiers = agrandir(getattr(self, 'quartiers', None), np.int32)
+        self.types = agrandir(getattr(self, 'types', None), np.int32)
+        self.log_prix = agrandir(getattr(self, 'log_prix', None), np.float64)
+        self.log_surface = agrandir(getattr(self, 'log_surface', None), np.float64)
+        self.chambres = agrandir(getattr(self, 'chambres', None), np.float64)
+
+    def ajouter(self, rows):
+        """Ajouter des lignes (id, quartier, type, prix_num, surface_num, chambres, ingest_seq)"""
+        if self.taille + len(rows) > len(self.ids):
+            capacite = len(self.ids)
+            while capacite < self.taille + len(rows):
+                capacite *= 2
+            self._allouer(capacite)
+
+        for id, quartier, type_annonce, prix, surface, chambres, seq in rows:
+            # Annonce réécrite (nouvelle séquence d'ingestion) : mise à jour en place
+            nouvelle = id not in self.positions
+            i = self.taille if nouvelle else self.positions[id]
+            self.ids[i] = id
+            self.quartiers[i] = self.codes_quartier.setdefault((quartier or '').lower(), len(self.codes_quartier))
+            self.types[i] = self.codes_type.setdefault((type_annonce or '').lower(), len(self.codes_type))
+            self.log_prix[i] = np.log(prix) if prix and prix > 0 else np.nan
+            self.log_surface[i] = np.log(surface) if surface and surface > 0 else np.nan
+            self.chambres[i] = chambres if chambres is not None else np.nan
+            self.positions[id] = i
+            if nouvelle:
+                self.taille += 1
+            self.dernier_seq = max(self.dernier_seq, seq or 0)
+
+    def voisins(self, annonce_id, k=6):
+        """Identifiants des k annonces les plus proches (None si inconnue)"""
+        i = self.positions.get(annonce_id)
+        if i is None:
+            return None
+        n = self.taille
+
+        def ecart(colonne, poids):
+            diff = colonne[:n] - colonne[i]
+            return np.where(np.isnan(diff), PENALITE_INCONNUE, poids * diff * diff)
+
+        distances = (
+            POIDS_QUARTIER * (self.quartiers[:n] != self.quartiers[i])
+            + POIDS_TYPE * (self.types[:n] != self.types[i])
+            + ecart(self.log_prix, POIDS_PRIX)
+            + ecart(self.log_surface, POIDS_SURFACE)
+            + ecart(self.chambres, POIDS_CHAMBRES)
+        )
+        distances[i] = np.inf
+
+        k = min(k, n - 1)
+        if k <= 0:
+            return []
+        proches = np.argpartition(distances, k - 1)[:k]
+        proches = proches[np.argsort(distances[proches])]
+        return [int(self.ids[j]) for j in proches]
+
+
+_index = IndexSimilarite()
+_index_lock = threading.Lock()
+
+
+def rafraichir_index():
+    """Charger dans l'index les annonces ingérées depuis le dernier chargement"""
+    if get_ingest_cursor() <= _index.dernier_seq:
+        return
+    with _index_lock:
+        try:
+            conn = get_db_connection_lecture()
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT id, quartier, type, prix_num, surface_num, chambres, ingest_seq
+                FROM annonces
+                WHERE ingest_seq > ?
+                ORDER BY ingest_seq
+            ''', (_index.dernier_seq,))
+            while True:
+                rows = cursor.fetchmany(5000)
+                if not rows:
+                    break
+                _index.ajouter([tuple(row) for row in rows])
+        except Exception as e:
+            print(f"Erreur rafraîchissement index de similarité: {e}")
+        finally:
+            if 'conn' in locals():
+                conn.close()
+
+
+def get_annonces_similaires_ids(annonce_id, k=6):
+    """Identifiants des annonces les plus proches d'une annonce donnée"""
+    rafraichir_index()
+    # ajouter() peut réallouer les colonnes et avancer taille pendant le calcul
+    with _index_lock:
+        return _index.voisins(annonce_id, k)
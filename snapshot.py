@@ -0,0 +1,102 @@
+import os
+import sqlite3
+import threading
+import time
+from urllib.parse import quote
+from database import get_db_path
+
+# Taille de la projection mémoire (mmap) des connexions de lecture (octets)
+TAILLE_MMAP_LECTURE = int(os.getenv('SNAPSHOT_MMAP_SIZE', 256 * 1024 * 1024))
+
+_publication_lock = threading.Lock()
+
+
+def get_snapshot_path():
+    """Chemin du snapshot de lecture (SNAPSHOT_DATABASE_URL ou <base>_lecture.db)"""
+    snapshot = os.getenv('SNAPSHOT_DATABASE_URL')
+    if snapshot:
+        return snapshot[10:] if snapshot.startswith('sqlite:///') else snapshot
+    base, extension = os.path.splitext(get_db_path())
+    return f"{base}_lecture{extension or '.db'}"
+
+
+def publier_snapshot():
+    """Publier un snapshot de lecture de la base principale
+
+    Copie via l'API de backup SQLite dans un fichier temporaire, passe en
+    journal DELETE, ANALYZE puis VACUUM, et remplace atomiquement le snapshot
+    précédent (os.replace). Les connexions déjà ouvertes terminent sur
+    l'ancien fichier ; les suivantes ouvrent le nouveau.
+    """
+    chemin = get_snapshot_path()
+    temporaire = f"{chemin}.{os.getpid()}.{threading.get_ident()}.tmp"
+    debut = time.perf_counter()
+    with _publication_lock:
+        try:
+            source = sqlite3.connect(get_db_path(), timeout=30)
+            copie = sqlite3.connect(temporaire, isolation_level=None)
+            source.backup(copie)
+            source.close()
+
+            # Fichier autonome (pas de -wal) et statistiques à jour pour le planificateur
+            copie.execute('PRAGMA journal_mode = DELETE')
+            copie.execute('ANALYZE')
+            copie.execute('VACUUM')
+            copie.close()
+
+            with open(temporaire, 'rb') as f:
+                os.fsync(f.fileno())
+            os.replace(temporaire, chemin)
+            print(f"📸 Snapshot de lecture publié : {chemin} "
+                  f"({os.path.getsize(chemin) // 1024} Ko en {time.perf_counter() - debut:.2f}s)")
+            return True
+        except Exception as e:
+            print(f"❌ Erreur publication snapshot : {e}")
+            return False
+        finally:
+            if 'source' in locals():
+                source.close()
+            if 'copie' in locals():
+                copie.close()
+            if os.path.exists(temporaire):
+                os.remove(temporaire)
+
+
+def version_snapshot():
+    """Identité du snapshot publié (inode, taille, date de modification), None s'il est absent
+
+    Change à chaque publication (os.replace) : un lecteur détecte un nouveau
+    jeu de données par un simple stat, sans ouvrir de connexion SQLite.
+    """
+    try:
+        etat = os.stat(get_snapshot_path())
+    except FileNotFoundError:
+        return None
+    return (etat.st_ino, etat.st_size, etat.st_mtime_ns)
+
+
+def invalider_snapshot():
+    """Supprimer le snapshot (schéma périmé) : les lectures repassent sur la base principale"""
+    try:
+        os.remove(get_snapshot_path())
+    except FileNotFoundError:
+        pass
+
+
+def ouvrir_snapshot():
+    """Connexion en lecture seule sur le snapshot courant (None s'il n'est pas publié)
+
+    ``immutable=1`` : SQLite ne pose aucun verrou et ne surveille pas les
+    modifications, le fichier n'étant jamais réécrit mais remplacé.
+    """
+    chemin = get_snapshot_path()
+    if not os.path.exists(chemin):
+        return None
+    conn = sqlite3.connect(f"file:{quote(os.path.abspath(chemin))}?immutable=1", uri=True)
+    conn.execute(f'PRAGMA mmap_size = {TAILLE_MMAP_LECTURE}')
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+if __name__ == "__main__":
+    publier_snapshot()
@@ -0,0 +1,226 @@
+import multiprocessing
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# Sources exécutées par défaut (SOURCES=tonkro,demo... pour surcharger) ;
+# jumia_house et facebook_marketplace n'ont pas encore d'extracteur
+SOURCES_PAR_DEFAUT = 'tonkro'
+
+# Registre des adaptateurs par nom
+SOURCES = {}
+
+
+def enregistrer_source(classe):
+    """Décorateur : enregistrer un adaptateur de source sous son nom"""
+    SOURCES[classe.nom] = classe
+    return classe
+
+
+class AdaptateurSource:
+    """Interface d'une source d'annonces
+
+    ``decouvrir`` liste les références des annonces (URLs de détail),
+    ``analyser`` transforme une référence en annonce (None si invalide).
+    Chaque adaptateur est instancié dans le processus qui l'exécute.
+    """
+
+    nom = None
+    libelle = None
+    # Pause (secondes) entre deux annonces analysées, pour respecter le serveur
+    pause = 0
+
+    def decouvrir(self):
+        raise NotImplementedError
+
+    def analyser(self, reference):
+        raise NotImplementedError
+
+    def sante(self):
+        """Rapport de santé par hôte de la politique de récupération (vide si locale)"""
+        return {}
+
+
+class AdaptateurWeb(AdaptateurSource):
+    """Adaptateur HTTP : session, politique de récupération et extracteurs de RealEstateScraper"""
+
+    pause = 1
+
+    def __init__(self):
+        # Import tardif : requests/bs4 ne sont chargés que dans les processus de scraping
+        from real_scraper import RealEstateScraper
+        self.scraper = RealEstateScraper()
+
+    def sante(self):
+        return self.scraper.fetch.rapport()
+
+
+@enregistrer_source
+class Tonkro(AdaptateurWeb):
+    nom = 'tonkro'
+    libelle = 'Tonkro.ci'
+
+    categories = [
+        "https://tonkro.ci/categorie/immobilier/vente-maison-villa",
+        "https://tonkro.ci/categorie/immobilier/location-maison-villa",
+        "https://tonkro.ci/categorie/immobilier/vente-appartement",
+        "https://tonkro.ci/categorie/immobilier/location-appartement"
+    ]
+
+    def decouvrir(self):
+        from bs4 import BeautifulSoup
+        from politique_fetch import CircuitOuvert
+        for url in self.categories:
+            try:
+                response = self.scraper.fetch.get(url, timeout=15)
+                if response.status_code != 200:
+                    continue
+                soup = BeautifulSoup(response.content, 'html.parser')
+                # Ces sélecteurs peuvent changer selon la structure du site
+                for link in soup.find_all('a', href=re.compile(r'/annonce/'))[:5]:  # 5 par catégorie
+                    annonce_url = link.get('href')
+                    if not annonce_url.startswith('http'):
+                        annonce_url = 'https://tonkro.ci' + annonce_url
+                    yield annonce_url
+            except CircuitOuvert:
+                # Source en panne : inutile d'essayer les autres catégories
+                raise
+            except Exception as e:
+                print(f"Erreur URL {url}: {e}")
+
+    def analyser(self, reference):
+        return self.scraper.scrape_single_tonkro_ad(reference)
+
+
+@enregistrer_source
+class JumiaHouse(AdaptateurSource):
+    nom = 'jumia_house'
+    libelle = 'Jumia House'
+
+    def decouvrir(self):
+        # À implémenter selon la structure de https://house.jumia.ci (même logique que Tonkro)
+        return iter(())
+
+    def analyser(self, reference):
+        return None
+
+
+@enregistrer_source
+class FacebookMarketplace(AdaptateurSource):
+    nom = 'facebook_marketplace'
+    libelle = 'Facebook Marketplace'
+
+    def decouvrir(self):
+        # Facebook nécessite une approche différente (authentification, JavaScript)
+        return iter(())
+
+    def analyser(self, reference):
+        return None
+
+
+@enregistrer_source
+class Demo(AdaptateurSource):
+    """Source locale : générateurs d'annonces fictives de fake_scraper (tests, démonstration)"""
+    nom = 'demo'
+    libelle = 'Annonces de démonstration'
+
+    def decouvrir(self):
+        from fake_scraper import scrape_afribaba, scrape_jumia_deal, scrape_tonkro
+        for generateur in (scrape_tonkro, scrape_jumia_deal, scrape_afribaba):
+            yield from generateur()
+
+    def analyser(self, reference):
+        return reference
+
+
+def sources_actives():
+    return [nom.strip() for nom in os.getenv('SOURCES', SOURCES_PAR_DEFAUT).split(',') if nom.strip()]
+
+
+def executer_source(nom):
+    """Exécuter un adaptateur (dans un processus du pool) ; retourne (annonces, statistiques)"""
+    from politique_fetch import CircuitOuvert
+    debut = time.perf_counter()
+    annonces = []
+    references = 0
+    erreurs = 0
+    adaptateur = None
+    try:
+        adaptateur = SOURCES[nom]()
+        for reference in adaptateur.decouvrir():
+            references += 1
+            if annonces and adaptateur.pause:
+                time.sleep(adaptateur.pause)
+            try:
+                annonce = adaptateur.analyser(reference)
+            except CircuitOuvert:
+                raise
+            except Exception as e:
+                erreurs += 1
+                print(f"Erreur analyse {nom} {reference}: {e}")
+                continue
+            if annonce:
+                annonces.append(annonce)
+    except CircuitOuvert as e:
+        print(f"⛔ {e}")
+    except Exception as e:
+        erreurs += 1
+        print(f"Erreur source {nom}: {e}")
+
+    return annonces, {
+        'source': nom,
+        'references': references,
+        'annonces': len(annonces),
+        'erreurs': erreurs,
+        'duree': time.perf_counter() - debut,
+        'sante': adaptateur.sante() if adaptateur else {},
+    }
+
+
+def collecter(noms=None, processus=None):
+    """Exécuter les adaptateurs en parallèle dans un pool de processus
+
+    Retourne ``(annonces, statistiques)``, une entrée de statistiques par source.
+    Avec un seul adaptateur ou ``processus=1``, tout s'exécute dans ce processus.
+    """
+    noms = noms or sources_actives()
+    inconnues = [nom for nom in noms if nom not in SOURCES]
+    if inconnues:
+        print(f"❌ Sources inconnues ignorées : {', '.join(inconnues)}")
+        noms = [nom for nom in noms if nom in SOURCES]
+    processus = processus or int(os.getenv('SCRAPER_PROCESSUS', 0)) or min(len(noms), os.cpu_count() or 1)
+
+    annonces = []
+    statistiques = []
+    if processus <= 1 or len(noms) <= 1:
+        for nom in noms:
+            resultat, stats = executer_source(nom)
+            annonces.extend(resultat)
+            statistiques.append(stats)
+        return annonces, statistiques
+
+    # spawn : le processus parent a des threads (serveur web, scraper périodique)
+    contexte = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=processus, mp_context=contexte) as pool:
+        futures = {pool.submit(executer_source, nom): nom for nom in noms}
+        for future in as_completed(futures):
+            try:
+                resultat, stats = future.result()
+            except Exception as e:
+                print(f"Erreur processus source {futures[future]}: {e}")
+                continue
+            annonces.extend(resultat)
+            statistiques.append(stats)
+    return annonces, statistiques
+
+
+def afficher_debit(statistiques):
+    """Afficher le débit et la santé de chaque adaptateur"""
+    from politique_fetch import afficher_rapport_sante
+    print("📊 Débit par source :")
+    for stats in sorted(statistiques, key=lambda s: s['source']):
+        debit = stats['annonces'] / stats['duree'] if stats['duree'] > 0 else 0
+        print(f"   {SOURCES[stats['source']].libelle} : {stats['annonces']}/{stats['references']} annonces "
+              f"en {stats['duree']:.1f}s ({debit:.2f} annonces/s, {stats['erreurs']} erreurs)")
+        afficher_rapport_sante(stats['sante'])
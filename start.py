@@ -3,47 +3,44 @@
 Script de démarrage pour initialiser l'application avec des données
 """
 
+import time
+
+# Mesurer le temps de démarrage depuis le lancement du script
+DEBUT_DEMARRAGE = time.perf_counter()
+
 import os
 import sys
 import threading
-import time
 from datetime import datetime
 
 # Ajouter le répertoire courant au PYTHONPATH
 sys.path.insert(0, os.path.dirname(__file__))
 
-def initialize_with_sample_data():
-    """Initialise la base de données avec des données d'exemple"""
-    print("🚀 Initialisation de l'application...")
-    
-    try:
-        from database import init_database
-        from real_scraper import fetch_daily_ads
-        
-        # Initialiser la base de données
-        print("📊 Initialisation de la base de données...")
-        init_database()
-        
-        # Générer des annonces d'exemple
-        print("📝 Génération d'annonces d'exemple...")
-        annonces = fetch_daily_ads()
-        print(f"✅ {len(annonces)} annonces générées")
-        
-        return True
-    except Exception as e:
-        print(f"❌ Erreur lors de l'initialisation: {e}")
-        return False
-
 def start_periodic_scraper():
     """Démarre le scraper périodique en arrière-plan"""
     def run_scraper():
         while True:
             try:
                 print("🔄 Exécution du scraper automatique...")
+                # Import tardif : requests/bs4 ne sont chargés qu'ici, après le démarrage du serveur
                 from real_scraper import fetch_daily_ads
                 annonces = fetch_daily_ads()
                 print(f"✅ Scraper terminé: {len(annonces)} annonces")
                 
+                # Envoyer les alertes des recherches sauvegardées
+                from alertes import drainer_outbox
+                envoyees = drainer_outbox()
+                print(f"🔔 {envoyees} alertes envoyées")
+
+                # Déplacer les annonces anciennes vers la base d'archive
+                from archivage import archiver
+                archives = archiver()
+
+                # Le snapshot est republié à chaque ingestion ; l'archivage le modifie aussi
+                if archives:
+                    from snapshot import publier_snapshot
+                    publier_snapshot()
+
                 # Attendre 12 heures avant la prochaine exécution
                 time.sleep(12 * 60 * 60)
             except Exception as e:
@@ -57,16 +54,22 @@ def start_periodic_scraper():
     print("🤖 Scraper automatique démarré")
 
 if __name__ == "__main__":
-    # Initialiser avec des données d'exemple
-    initialize_with_sample_data()
-    
     # Démarrer l'application Flask
-    from app import app
+    debut_imports = time.perf_counter()
+    from app import app, ensure_database_initialized
+    duree_imports = time.perf_counter() - debut_imports
+    
+    # Vérification du schéma (PRAGMA user_version) ; migration seulement si nécessaire
+    debut_init = time.perf_counter()
+    ensure_database_initialized()
+    duree_init = time.perf_counter() - debut_init
     
-    # Démarrer le scraper en arrière-plan
+    # Premier scraping en arrière-plan : le port est ouvert immédiatement
     start_periodic_scraper()
     
     # Lancer l'application
     port = int(os.environ.get('PORT', 5000))
+    print(f"⏱️ Imports: {duree_imports * 1000:.0f} ms, base de données: {duree_init * 1000:.0f} ms, "
+          f"total: {(time.perf_counter() - DEBUT_DEMARRAGE) * 1000:.0f} ms")
     print(f"🌐 Démarrage de l'application sur le port {port}")
     app.run(host='0.0.0.0', port=port, debug=False)
\ No newline at end of file
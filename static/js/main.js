@@ -1,9 +1,20 @@
 // Application JavaScript principale
 
+// Intervalle de rafraîchissement incrémental (ms)
+const CHANGES_POLL_INTERVAL = 60000;
+
+// Image affichée pour les annonces sans photo
+const DEFAULT_IMAGE = 'https://via.placeholder.com/300x200?text=Immobilier';
+
+// Curseur du flux des changements et annonces affichées
+let lastCursor = null;
+let currentAnnonces = [];
+
 document.addEventListener('DOMContentLoaded', function() {
     // Initialisation
     updateCurrentDate();
     loadStatistics();
+    loadQuartiers();
     loadAnnonces();
     
     // Gestion du formulaire de recherche
@@ -14,8 +25,38 @@ document.addEventListener('DOMContentLoaded', function() {
             loadAnnonces();
         });
     }
+    
+    // Nouvelles annonces poussées par le serveur, sinon interrogation périodique
+    if (window.EventSource) {
+        subscribeToUpdates();
+    } else {
+        setInterval(pollChanges, CHANGES_POLL_INTERVAL);
+    }
 });
 
+// S'abonner au flux SSE des nouvelles annonces
+function subscribeToUpdates() {
+    const source = new EventSource('/api/annonces/flux');
+    
+    source.addEventListener('annonces', function(e) {
+        const annonces = JSON.parse(e.data);
+        annonces.forEach(a => {
+            if (lastCursor !== null && a.ingest_seq > lastCursor) {
+                lastCursor = a.ingest_seq;
+            }
+        });
+        mergeNouvellesAnnonces(annonces);
+    });
+    
+    source.addEventListener('statistiques', function(e) {
+        updateStatistics(JSON.parse(e.data));
+        loadQuartiers();
+    });
+    
+    // Des événements ont été perdus : rattrapage via le flux des changements
+    source.addEventListener('resync', pollChanges);
+}
+
 // Mettre à jour la date courante
 function updateCurrentDate() {
     const now = new Date();
@@ -36,16 +77,41 @@ function updateCurrentDate() {
 function loadStatistics() {
     fetch('/api/statistiques')
         .then(response => response.json())
-        .then(data => {
-            const stats = data.statistiques;
-            updateStatElement('total-annonces', stats.total_annonces);
-            updateStatElement('annonces-aujourdhui', stats.annonces_aujourd_hui);
-            updateStatElement('ventes', stats.ventes);
-            updateStatElement('locations', stats.locations);
-        })
+        .then(data => updateStatistics(data.statistiques))
         .catch(error => console.error('Erreur chargement statistiques:', error));
 }
 
+// Afficher les statistiques
+function updateStatistics(stats) {
+    updateStatElement('total-annonces', stats.total_annonces);
+    updateStatElement('annonces-aujourdhui', stats.annonces_aujourd_hui);
+    updateStatElement('ventes', stats.ventes);
+    updateStatElement('locations', stats.locations);
+}
+
+// Charger les quartiers du formulaire (revalidés par ETag : 304 si inchangés)
+function loadQuartiers() {
+    fetch('/api/quartiers')
+        .then(response => response.json())
+        .then(data => updateQuartiers(data.quartiers))
+        .catch(error => console.error('Erreur chargement quartiers:', error));
+}
+
+// Remplir la liste des quartiers avec leurs compteurs, en conservant la sélection
+function updateQuartiers(quartiers) {
+    const select = document.getElementById('quartier');
+    if (!select) return;
+    
+    const selection = select.value;
+    select.length = 1;  // Garder « Tous les quartiers »
+    quartiers.forEach(q => {
+        const label = q.aujourd_hui ? `${q.nom} (${q.total}, ${q.aujourd_hui} aujourd'hui)` : `${q.nom} (${q.total})`;
+        select.add(new Option(label, q.valeur));
+    });
+    select.value = selection;
+    if (select.value !== selection) select.value = '';
+}
+
 // Mettre à jour un élément de statistique
 function updateStatElement(elementId, value) {
     const element = document.getElementById(elementId);
@@ -67,18 +133,20 @@ function loadAnnonces() {
     let url = '/api/annonces/du-jour';
     const params = new URLSearchParams();
     
+    // Représentation compacte : contacts chargés à la demande
+    params.append('format', 'resume');
     if (quartier) params.append('quartier', quartier);
     if (type) params.append('type', type);
     
-    if (params.toString()) {
-        url += '?' + params.toString();
-    }
+    url += '?' + params.toString();
     
     fetch(url)
         .then(response => response.json())
         .then(data => {
-            displayAnnonces(data.annonces);
-            updateResultsInfo(data.annonces.length, quartier, type);
+            lastCursor = data.cursor;
+            currentAnnonces = data.annonces;
+            displayAnnonces(currentAnnonces);
+            updateResultsInfo(currentAnnonces.length, quartier, type);
         })
         .catch(error => {
             console.error('Erreur chargement annonces:', error);
@@ -86,6 +154,43 @@ function loadAnnonces() {
         });
 }
 
+// Récupérer uniquement les annonces ajoutées depuis le dernier chargement
+function pollChanges() {
+    if (lastCursor === null) return;
+    
+    fetch('/api/annonces/changes?since=' + encodeURIComponent(lastCursor))
+        .then(response => response.json())
+        .then(data => {
+            lastCursor = data.cursor;
+            if (data.annonces.length === 0) return;
+            
+            mergeNouvellesAnnonces(data.annonces);
+            loadStatistics();
+        })
+        .catch(error => console.error('Erreur chargement changements:', error));
+}
+
+// Ajouter en tête de liste les nouvelles annonces correspondant aux filtres
+function mergeNouvellesAnnonces(annonces) {
+    const quartier = document.getElementById('quartier')?.value || '';
+    const type = document.getElementById('type')?.value || '';
+    const today = new Date().toISOString().slice(0, 10);
+    const knownIds = new Set(currentAnnonces.map(a => a.id));
+    
+    const nouvelles = annonces.filter(a =>
+        !knownIds.has(a.id) &&
+        a.date_publication === today &&
+        (!quartier || (a.quartier || '').toLowerCase().includes(quartier)) &&
+        (!type || (a.type || '').toLowerCase().includes(type))
+    ).reverse();
+    
+    if (nouvelles.length > 0) {
+        currentAnnonces = nouvelles.concat(currentAnnonces);
+        displayAnnonces(currentAnnonces);
+        updateResultsInfo(currentAnnonces.length, quartier, type);
+    }
+}
+
 // Afficher les annonces
 function displayAnnonces(annonces) {
     const container = document.getElementById('annonces-container');
@@ -118,7 +223,7 @@ function createAnnonceCard(annonce) {
         <div class="col-lg-4 col-md-6 col-12 mb-4 fade-in">
             <div class="card annonce-card">
                 <div class="position-relative">
-                    <img src="${annonce.image}" 
+                    <img src="${annonce.image || DEFAULT_IMAGE}" 
                          class="card-img-top annonce-image" 
                          alt="${annonce.titre}">
                     <span class="badge annonce-type type-${annonce.type}">
@@ -153,34 +258,14 @@ function createAnnonceCard(annonce) {
                             <i class="fas fa-user me-1"></i>
                             Contact
                         </h6>
-                        <div class="contact-info">
-                            <div class="mb-1">
-                                <strong>${annonce.contact_nom || 'Propriétaire'}</strong>
-                            </div>
-                            <div class="contact-buttons">
-                                ${annonce.contact_telephone ? 
-                                    `<a href="tel:${annonce.contact_telephone}" 
-                                       class="btn btn-sm btn-outline-primary me-1 mb-1">
-                                        <i class="fas fa-phone me-1"></i>
-                                        Appeler
-                                    </a>` : ''
-                                }
-                                ${annonce.contact_whatsapp ? 
-                                    `<a href="https://wa.me/${annonce.contact_whatsapp.replace(/\D/g, '')}" 
-                                       target="_blank"
-                                       class="btn btn-sm btn-outline-success me-1 mb-1">
-                                        <i class="fab fa-whatsapp me-1"></i>
-                                        WhatsApp
-                                    </a>` : ''
-                                }
-                                ${annonce.contact_email ? 
-                                    `<a href="mailto:${annonce.contact_email}" 
-                                       class="btn btn-sm btn-outline-info mb-1">
-                                        <i class="fas fa-envelope me-1"></i>
-                                        Email
-                                    </a>` : ''
-                                }
-                            </div>
+                        <div class="contact-info" id="contact-${annonce.id}">
+                            ${'contact_nom' in annonce ? createContactInfo(annonce) :
+                                `<button type="button" class="btn btn-sm btn-outline-primary"
+                                         onclick="loadContact(${annonce.id})">
+                                    <i class="fas fa-address-card me-1"></i>
+                                    Afficher le contact
+                                </button>`
+                            }
                         </div>
                     </div>
                     
@@ -194,6 +279,52 @@ function createAnnonceCard(annonce) {
     `;
 }
 
+// Contenu de la section contact d'une annonce
+function createContactInfo(annonce) {
+    return `
+        <div class="mb-1">
+            <strong>${annonce.contact_nom || 'Propriétaire'}</strong>
+        </div>
+        <div class="contact-buttons">
+            ${annonce.contact_telephone ? 
+                `<a href="tel:${annonce.contact_telephone}" 
+                   class="btn btn-sm btn-outline-primary me-1 mb-1">
+                    <i class="fas fa-phone me-1"></i>
+                    Appeler
+                </a>` : ''
+            }
+            ${annonce.contact_whatsapp ? 
+                `<a href="https://wa.me/${annonce.contact_whatsapp.replace(/\D/g, '')}" 
+                   target="_blank"
+                   class="btn btn-sm btn-outline-success me-1 mb-1">
+                    <i class="fab fa-whatsapp me-1"></i>
+                    WhatsApp
+                </a>` : ''
+            }
+            ${annonce.contact_email ? 
+                `<a href="mailto:${annonce.contact_email}" 
+                   class="btn btn-sm btn-outline-info mb-1">
+                    <i class="fas fa-envelope me-1"></i>
+                    Email
+                </a>` : ''
+            }
+        </div>
+    `;
+}
+
+// Charger le détail d'une annonce pour afficher ses contacts
+function loadContact(annonceId) {
+    const container = document.getElementById('contact-' + annonceId);
+    if (!container) return;
+    
+    fetch('/api/annonces/' + annonceId)
+        .then(response => response.json())
+        .then(data => {
+            container.innerHTML = createContactInfo(data.annonce);
+        })
+        .catch(error => console.error('Erreur chargement contact:', error));
+}
+
 // Formater le prix
 function formatPrice(prix) {
     if (!prix) return 'Prix sur demande';
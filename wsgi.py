@@ -4,6 +4,10 @@ Point d'entrée WSGI pour l'application Flask
 Utilisé par Gunicorn pour servir l'application sur Render
 """
 
+import time
+
+DEBUT_DEMARRAGE = time.perf_counter()
+
 import os
 import sys
 
@@ -12,10 +16,12 @@ sys.path.insert(0, os.path.dirname(__file__))
 
 from app import app
 
-# Initialiser la base de données au démarrage
+# Initialiser la base de données au démarrage (simple lecture de PRAGMA user_version si à jour)
 from app import ensure_database_initialized
 ensure_database_initialized()
 
+print(f"⏱️ Application prête en {(time.perf_counter() - DEBUT_DEMARRAGE) * 1000:.0f} ms")
+
 if __name__ == "__main__":
     # Pour les tests locaux
     port = int(os.environ.get('PORT', 5000))